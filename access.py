@@ -0,0 +1,80 @@
+"""
+Кэш пользователей и ролей и единая проверка доступа для обработчиков.
+"""
+
+import time
+from functools import wraps
+from telegram.ext import ConversationHandler
+from config import USER_CACHE_TTL
+from database import db
+
+NOT_REGISTERED_TEXT = (
+    "⛔ Доступ запрещен.\n\n"
+    "Вы не зарегистрированы в системе. "
+    "Обратитесь к администратору для получения доступа."
+)
+
+class UserCache:
+    """Пользователи по Telegram ID с ограниченным временем жизни записей.
+    
+    Кэшируется и отсутствие пользователя, чтобы посторонние не нагружали БД.
+    """
+    
+    def __init__(self, ttl=USER_CACHE_TTL):
+        self.ttl = ttl
+        self.users = {}
+    
+    async def get(self, telegram_id):
+        """Пользователь из кэша или из БД (None, если не зарегистрирован)"""
+        cached = self.users.get(telegram_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        user = await db.get_user(telegram_id)
+        self.users[telegram_id] = (time.monotonic() + self.ttl, user)
+        return user
+    
+    def prune(self):
+        """Удаление устаревших записей"""
+        now = time.monotonic()
+        for telegram_id in [key for key, (expires_at, _) in self.users.items() if expires_at <= now]:
+            del self.users[telegram_id]
+    
+    def invalidate(self, telegram_id=None):
+        """Сброс записи пользователя (или всего кэша)"""
+        if telegram_id is None:
+            self.users.clear()
+        else:
+            self.users.pop(telegram_id, None)
+
+# Глобальный кэш пользователей
+user_cache = UserCache()
+
+async def get_role(telegram_id):
+    """Роль пользователя ('admin', 'user') или None, если он не зарегистрирован"""
+    user = await user_cache.get(telegram_id)
+    return user['role'] if user else None
+
+def require_role(role=None, denied_text="⛔ У вас нет прав для этого действия."):
+    """Декоратор обработчика: пропускает только зарегистрированных пользователей
+    (и только с ролью role, если она указана)"""
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(update, context, *args, **kwargs):
+            user_role = await get_role(update.effective_user.id)
+            
+            if user_role is None:
+                text = NOT_REGISTERED_TEXT
+            elif role is not None and user_role != role:
+                text = denied_text
+            else:
+                return await handler(update, context, *args, **kwargs)
+            
+            if update.callback_query:
+                await update.callback_query.answer()
+                await update.callback_query.edit_message_text(text)
+            else:
+                await update.effective_message.reply_text(text)
+            return ConversationHandler.END
+        return wrapper
+    return decorator
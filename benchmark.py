@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк методов Database на синтетических данных.
+Запускать только на локальной БД: синтетические встречи добавляются в таблицу meetings.
+
+Примеры:
+    python benchmark.py --meetings 100k                 # заполнить и замерить
+    python benchmark.py --no-seed --save-baseline       # замерить и сохранить как эталон
+    python benchmark.py --cleanup                       # удалить синтетические встречи
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta, timezone
+from database import db, MEETING_STATUS_PLANNED
+from synthetic_data import (
+    SYNTHETIC_USER_ID_START, delete_synthetic_meetings, get_reference_oiv_ids,
+    parse_count, seed_meetings
+)
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+def percentile(sorted_values, fraction):
+    """Перцентиль по отсортированным значениям (ближайший ранг)"""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(durations):
+    """Статистика замеров в миллисекундах"""
+    values = sorted(duration * 1000 for duration in durations)
+    return {
+        'p50': percentile(values, 0.50),
+        'p95': percentile(values, 0.95),
+        'p99': percentile(values, 0.99),
+        'mean': statistics.fmean(values),
+        'max': values[-1]
+    }
+
+async def consume(rows):
+    """Чтение асинхронного генератора до конца (для iter_meetings)"""
+    count = 0
+    async for _ in rows:
+        count += 1
+    return count
+
+async def build_cases():
+    """Замеряемые вызовы: имя -> функция без аргументов, возвращающая корутину"""
+    today = date.today()
+    oiv_ids = await get_reference_oiv_ids()
+    complexes = await db.get_complexes()
+    years = await db.get_meeting_years()
+    year = today.year if today.year in years else max(years, default=today.year)
+    month = today.month
+    oiv_id = oiv_ids[0]
+    complex_id = complexes[0]['id']
+    # Самый активный синтетический пользователь (у генератора он первый)
+    user_id = SYNTHETIC_USER_ID_START
+    
+    page = (await db.get_meetings_page({'year': year}))['meetings']
+    cursor_key = (page[-1]['meeting_date'], page[-1]['created_at'], page[-1]['id']) if page else None
+    meeting_id = page[0]['id'] if page else 0
+    now = datetime.now(timezone.utc)
+    
+    filters = {
+        'none': None,
+        'year': {'year': year},
+        'year_month': {'year': year, 'month': month},
+        'month': {'month': month},
+        'complex': {'complex_id': complex_id},
+        'oiv': {'oiv_id': oiv_id},
+        'status': {'status': "Отменена"},
+        'year_complex_status': {'year': year, 'complex_id': complex_id, 'status': "Состоялась"}
+    }
+    
+    cases = {}
+    for name, value in filters.items():
+        cases[f'get_all_meetings[{name}]'] = lambda value=value: db.get_all_meetings(value)
+    for name in ('none', 'year_month', 'oiv'):
+        cases[f'count_meetings[{name}]'] = lambda value=filters[name]: db.count_meetings(value)
+    
+    cases.update({
+        'iter_meetings[year]': lambda: consume(db.iter_meetings({'year': year})),
+        'get_meetings_page[first]': lambda: db.get_meetings_page({'year': year}),
+        'get_meetings_page[next]': lambda: db.get_meetings_page({'year': year}, cursor_key),
+        'get_meeting': lambda: db.get_meeting(meeting_id),
+        'get_user_meetings': lambda: db.get_user_meetings(user_id),
+        'search_meetings': lambda: db.search_meetings("бюджет согласование"),
+        'get_meeting_years': lambda: db.get_meeting_years(),
+        'get_meeting_months': lambda: db.get_meeting_months(year),
+        'get_month_counts': lambda: db.get_month_counts(year),
+        'get_meeting_day_counts': lambda: db.get_meeting_day_counts(today.year, today.month),
+        'get_meeting_day_counts[oiv]': lambda: db.get_meeting_day_counts(today.year, today.month, oiv_id),
+        'get_planned_meetings_due': lambda: db.get_planned_meetings_due(today + timedelta(days=1)),
+        'get_meeting_changes': lambda: db.get_meeting_changes(now - timedelta(days=1), now),
+        'get_statistics[all]': lambda: db.get_statistics(),
+        'get_statistics[year]': lambda: db.get_statistics(date(year, 1, 1), date(year, 12, 31)),
+        'get_statistics_summary[year]': lambda: db.get_statistics_summary(date(year, 1, 1), date(year, 12, 31)),
+        'get_period_statistics[month]': lambda: db.get_period_statistics(today - timedelta(days=30), today),
+        'get_all_oivs': lambda: db.get_all_oivs(),
+        'get_user': lambda: db.get_user(user_id)
+    })
+    return cases
+
+async def run_reads(cases, repeat, warmup):
+    """Замер читающих методов: имя -> статистика"""
+    results = {}
+    for name, call in cases.items():
+        for _ in range(warmup):
+            await call()
+        
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await call()
+            durations.append(time.perf_counter() - started)
+        results[name] = summarize(durations)
+    return results
+
+async def run_writes(repeat):
+    """Замер вставки, изменения и удаления встреч (созданные встречи удаляются)"""
+    oiv_ids = await get_reference_oiv_ids()
+    rng = random.Random(0)
+    durations = {'add_meeting': [], 'update_meeting': [], 'delete_meeting': []}
+    
+    for index in range(repeat):
+        meeting_date = date.today() + timedelta(days=rng.randint(1, 30))
+        
+        started = time.perf_counter()
+        meeting_id = await db.add_meeting(
+            SYNTHETIC_USER_ID_START + index, "Бенчмарк", rng.choice(oiv_ids),
+            meeting_date, MEETING_STATUS_PLANNED, 30, "Бенчмарк: вставка встречи"
+        )
+        durations['add_meeting'].append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        await db.update_meeting(meeting_id, status="Состоялась", duration_minutes=45)
+        durations['update_meeting'].append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        await db.delete_meeting(meeting_id)
+        durations['delete_meeting'].append(time.perf_counter() - started)
+    
+    return {name: summarize(values) for name, values in durations.items()}
+
+def print_report(results, baseline, tolerance):
+    """Таблица результатов со сравнением p50 с эталоном; возвращает число регрессий"""
+    regressions = 0
+    print(f"{'метод':<40} {'p50':>9} {'p95':>9} {'p99':>9} {'эталон p50':>11} {'изм.':>8}")
+    for name, stats in results.items():
+        line = f"{name:<40} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f}"
+        reference = baseline.get(name)
+        if reference:
+            ratio = stats['p50'] / reference['p50'] if reference['p50'] else 1.0
+            mark = " ⚠️" if ratio > 1 + tolerance else ""
+            regressions += bool(mark)
+            line += f" {reference['p50']:>11.2f} {ratio:>7.2f}x{mark}"
+        print(line)
+    print("Время в миллисекундах.")
+    return regressions
+
+async def run_benchmark(args):
+    await db.connect()
+    try:
+        if args.cleanup:
+            deleted = await delete_synthetic_meetings()
+            print(f"Удалено синтетических встреч: {deleted}")
+            return 0
+        
+        if not args.no_seed:
+            count = parse_count(args.meetings)
+            started = time.perf_counter()
+            seeded = await seed_meetings(count, users=args.users, random_seed=args.random_seed)
+            print(f"Создано синтетических встреч: {seeded} за {time.perf_counter() - started:.1f} с")
+        
+        results = await run_reads(await build_cases(), args.repeat, args.warmup)
+        results.update(await run_writes(args.repeat))
+    finally:
+        await db.close()
+    
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f).get(args.meetings, {})
+    
+    regressions = print_report(results, baseline, args.tolerance)
+    
+    if args.save_baseline:
+        # Эталоны хранятся по размеру данных: 10k, 100k, 1M
+        saved = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                saved = json.load(f)
+        saved[args.meetings] = results
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, ensure_ascii=False, indent=2)
+        print(f"Эталон сохранен в {args.baseline} ({args.meetings})")
+    elif regressions:
+        print(f"❌ Медленнее эталона более чем на {args.tolerance:.0%}: {regressions}")
+        return 1
+    
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк методов Database на синтетических данных")
+    parser.add_argument('--meetings', default='10k', help="Размер данных: 10k, 100k, 1M (по умолчанию 10k)")
+    parser.add_argument('--users', type=int, default=200, help="Число синтетических пользователей")
+    parser.add_argument('--random-seed', type=int, default=42, help="Зерно генератора данных")
+    parser.add_argument('--no-seed', action='store_true', help="Не пересоздавать данные, замерить на текущих")
+    parser.add_argument('--repeat', type=int, default=20, help="Замеров на метод")
+    parser.add_argument('--warmup', type=int, default=2, help="Прогревочных вызовов на метод")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Файл эталонных результатов")
+    parser.add_argument('--save-baseline', action='store_true', help="Сохранить результаты как эталон")
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help="Допустимое замедление p50 относительно эталона (по умолчанию 0.2 = 20%%)"
+    )
+    parser.add_argument('--cleanup', action='store_true', help="Только удалить синтетические встречи")
+    args = parser.parse_args()
+    
+    return asyncio.run(run_benchmark(args))
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,17 +1,41 @@
+import asyncio
+import html
 import logging
+import os
+import shlex
 from datetime import datetime, date
-from telegram import Update, ReplyKeyboardRemove
+from dateutil.relativedelta import relativedelta
+from telegram import Update, ReplyKeyboardRemove, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
     ConversationHandler,
+    TypeHandler,
     filters,
     ContextTypes
 )
-from config import BOT_TOKEN, ADMIN_IDS
-from database import db
+from config import (
+    BOT_TOKEN, ADMIN_IDS, PERSISTENCE_UPDATE_INTERVAL,
+    CONVERSATION_TIMEOUT, SESSION_CLEANUP_INTERVAL, WEBHOOK_URL, CONCURRENT_UPDATES,
+    REMINDER_TIME, DIGEST_TIME, DIGEST_DAYS, METRICS_PORT, TELEGRAM_API_URL, TIMEZONE
+)
+from database import db, HIGHLIGHT_START, HIGHLIGHT_STOP
+from migrations import LATEST_VERSION
+from oiv_search import oiv_index
+from reference import reference
+from persistence import PostgresPersistence
+from access import NOT_REGISTERED_TEXT, get_role, require_role, user_cache
+from session import clear_dialog_data, evict_idle_sessions, last_activity, track_activity
+from webhook import run_webhook
+from update_processor import PerUserUpdateProcessor
+from notifications import notifier
+from reminders import send_meeting_reminders
+from digest import send_admin_digest
+from metrics import instrument_handlers, register_cache_gauge, start_metrics_server
+from importer import ImportFormatError, format_import_errors, import_meetings
+from exporter import export_filename, export_meetings
 from keyboards import *
 from states import *
 
@@ -22,25 +46,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Глобальные переменные для хранения данных во время диалога
-user_data = {}
-
 # === КОМАНДА /START ===
 async def start(update: Update, context):
     """Обработка команды /start"""
     user = update.effective_user
     telegram_id = user.id
     
-    # Проверяем, есть ли пользователь в базе
-    db_user = db.get_user(telegram_id)
+    # Проверяем, есть ли пользователь в базе (через кэш пользователей)
+    db_user = await user_cache.get(telegram_id)
     
     if not db_user:
         # Если пользователя нет в базе
-        await update.message.reply_text(
-            "⛔ Доступ запрещен.\n\n"
-            "Вы не зарегистрированы в системе. "
-            "Обратитесь к администратору для получения доступа."
-        )
+        await update.message.reply_text(NOT_REGISTERED_TEXT)
         return
     
     # Пользователь найден, приветствуем
@@ -65,23 +82,13 @@ async def start(update: Update, context):
         reply_markup=get_main_menu(db_user['role']),
         parse_mode='Markdown'
     )
-    
-    # Сохраняем роль пользователя в context
-    context.user_data['role'] = db_user['role']
 
 # === ДОБАВЛЕНИЕ ВСТРЕЧИ ===
+@require_role()
 async def add_meeting_start(update: Update, context):
     """Начало процесса добавления встречи"""
     user = update.effective_user
     
-    # Проверяем, может ли пользователь добавлять встречи
-    if 'role' not in context.user_data:
-        await update.message.reply_text(
-            "Сначала выполните команду /start",
-            reply_markup=get_main_menu()
-        )
-        return ConversationHandler.END
-    
     # Инициализируем данные встречи
     context.user_data['new_meeting'] = {
         'user_id': user.id,
@@ -90,13 +97,15 @@ async def add_meeting_start(update: Update, context):
     
     # Показываем выбор комплекса
     await update.message.reply_text(
-        "🏛️ *Выберите комплекс:*",
+        "🏛️ *Выберите комплекс*\n"
+        "или введите название ОИВ (например, ДГИ):",
         reply_markup=get_complexes_keyboard(),
         parse_mode='Markdown'
     )
     
     return SELECT_COMPLEX
 
+@require_role()
 async def select_complex(update: Update, context):
     """Обработка выбора комплекса"""
     query = update.callback_query
@@ -114,6 +123,47 @@ async def select_complex(update: Update, context):
     
     return SELECT_OIV
 
+@require_role()
+async def search_oiv_text(update: Update, context):
+    """Поиск ОИВ по введенному названию на шаге выбора комплекса"""
+    if update.message:
+        matches = oiv_index.search(update.message.text)
+        
+        if not matches:
+            await update.message.reply_text(
+                "🔍 ОИВ с таким названием не найден.\n\n"
+                "🏛️ *Выберите комплекс* или введите другое название:",
+                reply_markup=get_complexes_keyboard(),
+                parse_mode='Markdown'
+            )
+            return SELECT_COMPLEX
+        
+        best_score, best_oiv = matches[0]
+        
+        if best_score == 1.0 or len(matches) == 1:
+            # Однозначное совпадение - сразу переходим к выбору даты
+            context.user_data['new_meeting']['complex_id'] = best_oiv['complex_id']
+            context.user_data['new_meeting']['oiv_id'] = best_oiv['id']
+            
+            await update.message.reply_text(
+                f"🏢 *ОИВ:* {best_oiv['name']}\n\n"
+                "📅 *Выберите дату встречи:*\n\n"
+                "Используйте календарь ниже для выбора даты.\n"
+                "Отметкой • выделены дни, когда уже были встречи с этим ОИВ.",
+                reply_markup=await get_meetings_calendar_keyboard(oiv_id=best_oiv['id']),
+                parse_mode='Markdown'
+            )
+            return SELECT_DATE
+        
+        await update.message.reply_text(
+            "🔍 *Найденные ОИВ:*\n\n"
+            "Выберите нужный:",
+            reply_markup=get_oiv_matches_keyboard([oiv for _, oiv in matches]),
+            parse_mode='Markdown'
+        )
+        return SELECT_OIV
+
+@require_role()
 async def select_oiv(update: Update, context):
     """Обработка выбора ОИВ"""
     query = update.callback_query
@@ -131,16 +181,23 @@ async def select_oiv(update: Update, context):
     oiv_id = int(query.data.split('_')[1])
     context.user_data['new_meeting']['oiv_id'] = oiv_id
     
+    # ОИВ мог быть найден по названию, минуя выбор комплекса
+    oiv = reference.get_oiv(oiv_id)
+    if oiv:
+        context.user_data['new_meeting']['complex_id'] = oiv['complex_id']
+    
     # Показываем календарь для выбора даты
     await query.edit_message_text(
         "📅 *Выберите дату встречи:*\n\n"
-        "Используйте календарь ниже для выбора даты.",
-        reply_markup=get_calendar_keyboard(),
+        "Используйте календарь ниже для выбора даты.\n"
+        "Отметкой • выделены дни, когда уже были встречи с этим ОИВ.",
+        reply_markup=await get_meetings_calendar_keyboard(oiv_id=oiv_id),
         parse_mode='Markdown'
     )
     
     return SELECT_DATE
 
+@require_role()
 async def select_date(update: Update, context):
     """Обработка выбора даты из календаря"""
     query = update.callback_query
@@ -158,7 +215,7 @@ async def select_date(update: Update, context):
     
     if query.data == 'calendar_today':
         # Выбор сегодняшней даты
-        today = datetime.now().date()
+        today = datetime.now(TIMEZONE).date()
         context.user_data['new_meeting']['meeting_date'] = today
         date_str = today.strftime('%d.%m.%Y')
     elif query.data.startswith('calendar_day_'):
@@ -172,7 +229,9 @@ async def select_date(update: Update, context):
         _, _, year, month = query.data.split('_')
         await query.edit_message_text(
             "📅 *Выберите дату встречи:*",
-            reply_markup=get_calendar_keyboard(int(year), int(month)),
+            reply_markup=await get_meetings_calendar_keyboard(
+                int(year), int(month), oiv_id=context.user_data['new_meeting'].get('oiv_id')
+            ),
             parse_mode='Markdown'
         )
         return SELECT_DATE
@@ -190,6 +249,7 @@ async def select_date(update: Update, context):
     
     return SELECT_STATUS
 
+@require_role()
 async def select_status(update: Update, context):
     """Обработка выбора статуса встречи"""
     query = update.callback_query
@@ -218,6 +278,7 @@ async def select_status(update: Update, context):
         )
         return INPUT_SUMMARY
 
+@require_role()
 async def input_duration(update: Update, context):
     """Обработка ввода длительности"""
     if update.message:
@@ -243,6 +304,7 @@ async def input_duration(update: Update, context):
         
         return INPUT_SUMMARY
 
+@require_role()
 async def input_summary(update: Update, context):
     """Обработка ввода краткого содержания"""
     if update.message:
@@ -261,9 +323,9 @@ async def input_summary(update: Update, context):
         meeting_data = context.user_data['new_meeting']
         
         # Получаем информацию об ОИВ и комплексе
-        oiv = db.get_oiv(meeting_data['oiv_id'])
-        complexes = db.get_complexes()
-        complex_name = next((c['name'] for c in complexes if c['id'] == meeting_data['complex_id']), "Неизвестно")
+        oiv = reference.get_oiv(meeting_data['oiv_id'])
+        complex = reference.get_complex(meeting_data['complex_id'])
+        complex_name = complex['name'] if complex else "Неизвестно"
         
         # Форматируем дату
         date_str = meeting_data['meeting_date'].strftime('%d.%m.%Y')
@@ -294,6 +356,12 @@ async def input_summary(update: Update, context):
         
         return CONFIRM_MEETING
 
+def notify_admins(update: Update, text):
+    """Уведомление администраторов об изменении встречи (не ждет отправки)"""
+    user = update.effective_user
+    notifier.notify(f"{text} — {html.escape(user.full_name)}", actor_id=user.id)
+
+@require_role()
 async def confirm_meeting(update: Update, context):
     """Обработка подтверждения встречи"""
     query = update.callback_query
@@ -317,7 +385,7 @@ async def confirm_meeting(update: Update, context):
         meeting_data = context.user_data['new_meeting']
         
         try:
-            meeting_id = db.add_meeting(
+            meeting_id = await db.add_meeting(
                 user_id=meeting_data['user_id'],
                 user_name=meeting_data['user_name'],
                 oiv_id=meeting_data['oiv_id'],
@@ -330,6 +398,13 @@ async def confirm_meeting(update: Update, context):
             # Форматируем дату для ответа
             date_str = meeting_data['meeting_date'].strftime('%d.%m.%Y')
             
+            oiv = reference.get_oiv(meeting_data['oiv_id'])
+            notify_admins(
+                update,
+                f"➕ #{meeting_id} {html.escape(oiv['name'] if oiv else '?')}, "
+                f"{date_str}, {html.escape(meeting_data['status'])}"
+            )
+            
             await query.edit_message_text(
                 f"✅ Встреча успешно сохранена!\n\n"
                 f"📅 *Дата:* {date_str}\n"
@@ -352,20 +427,11 @@ async def confirm_meeting(update: Update, context):
         return ConversationHandler.END
 
 # === ПРОСМОТР ВСТРЕЧ ===
+@require_role()
 async def view_meetings_start(update: Update, context):
     """Начало просмотра встреч"""
-    # Проверяем, есть ли встречи
-    meetings = db.get_all_meetings()
-    
-    if not meetings:
-        await update.message.reply_text(
-            "📭 Встреч пока нет.\n"
-            "Вы можете добавить первую встречу."
-        )
-        return
-    
-    # Получаем список годов с встречами
-    years = db.get_meeting_years()
+    # Получаем список годов с встречами (пустой список - встреч нет)
+    years = await db.get_meeting_years()
     
     if not years:
         await update.message.reply_text(
@@ -376,10 +442,38 @@ async def view_meetings_start(update: Update, context):
     
     await update.message.reply_text(
         "📅 *Выберите год для просмотра встреч:*",
-        reply_markup=get_years_keyboard(),
+        reply_markup=await get_years_keyboard(years),
+        parse_mode='Markdown'
+    )
+
+async def show_meetings_page(query, context, cursor=None, backward=False):
+    """Показ страницы встреч по сохраненным фильтрам просмотра"""
+    filters = context.user_data.get('view_filters', {})
+    cursor_key = decode_page_cursor(cursor) if cursor else None
+    page = await db.get_meetings_page(filters, cursor_key=cursor_key, backward=backward)
+    
+    # Запоминаем текущую страницу для возврата из деталей встречи
+    context.user_data['view_page'] = {'cursor': cursor, 'backward': backward}
+    context.user_data['view_source'] = 'month'
+    
+    year = filters.get('year', '')
+    month = filters.get('month', '')
+    
+    month_names = [
+        "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
+    ]
+    month_name = month_names[month-1] if month else ""
+    
+    await query.edit_message_text(
+        f"📅 *{month_name} {year}*\n"
+        f"📋 *Найдено встреч:* {context.user_data.get('view_total', 0)}\n\n"
+        "*Выберите встречу для просмотра деталей:*",
+        reply_markup=get_meetings_keyboard(page),
         parse_mode='Markdown'
     )
 
+@require_role()
 async def view_meetings_callback(update: Update, context):
     """Обработка callback при просмотре встреч"""
     query = update.callback_query
@@ -395,7 +489,7 @@ async def view_meetings_callback(update: Update, context):
         await query.edit_message_text(
             f"📅 *Год:* {year}\n\n"
             "*Выберите месяц:*",
-            reply_markup=get_months_keyboard(year),
+            reply_markup=await get_months_keyboard(year),
             parse_mode='Markdown'
         )
     
@@ -405,39 +499,28 @@ async def view_meetings_callback(update: Update, context):
         year = int(year)
         month = int(month)
         
-        # Получаем встречи за выбранный месяц
-        meetings = db.get_all_meetings({'year': year, 'month': month})
+        # Считаем встречи за выбранный месяц (сами встречи грузятся постранично)
+        filters = {'year': year, 'month': month}
+        total = await db.count_meetings(filters)
         
-        if not meetings:
+        if not total:
             await query.edit_message_text(
                 f"📭 За {month}/{year} встреч нет.\n\n"
                 "Выберите другой месяц:",
-                reply_markup=get_months_keyboard(year)
+                reply_markup=await get_months_keyboard(year)
             )
             return
         
         # Сохраняем фильтры в context
-        context.user_data['view_filters'] = {'year': year, 'month': month}
-        context.user_data['view_meetings'] = meetings
-        context.user_data['view_page'] = 0
-        
-        month_names = [
-            "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-            "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-        ]
+        context.user_data['view_filters'] = filters
+        context.user_data['view_total'] = total
         
-        await query.edit_message_text(
-            f"📅 *{month_names[month-1]} {year}*\n"
-            f"📋 *Найдено встреч:* {len(meetings)}\n\n"
-            "*Выберите встречу для просмотра деталей:*",
-            reply_markup=get_meetings_keyboard(meetings, page=0),
-            parse_mode='Markdown'
-        )
+        await show_meetings_page(query, context)
     
     elif data.startswith('meeting_'):
         # Просмотр деталей встречи
         meeting_id = int(data.split('_')[1])
-        meeting = db.get_meeting(meeting_id)
+        meeting = await db.get_meeting(meeting_id)
         
         if not meeting:
             await query.edit_message_text("❌ Встреча не найдена.")
@@ -447,14 +530,7 @@ async def view_meetings_callback(update: Update, context):
         date_str = meeting['meeting_date'].strftime('%d.%m.%Y')
         
         # Формируем текст встречи
-        status_icons = {
-            'Состоялась': '✅',
-            'Запланирована': '⏰',
-            'Отменена': '❌',
-            'Перенесена': '↗️'
-        }
-        
-        status_icon = status_icons.get(meeting['status'], '📊')
+        status_icon = MEETING_STATUSES.get(meeting['status'], '📊')
         
         meeting_text = (
             f"{status_icon} *Встреча #{meeting['id']}*\n\n"
@@ -471,7 +547,7 @@ async def view_meetings_callback(update: Update, context):
         meeting_text += f"📝 *Содержание:*\n{meeting['summary']}"
         
         # Получаем роль пользователя
-        user_role = context.user_data.get('role', 'user')
+        user_role = await get_role(update.effective_user.id)
         
         await query.edit_message_text(
             meeting_text,
@@ -480,43 +556,21 @@ async def view_meetings_callback(update: Update, context):
         )
     
     elif data.startswith('prev_page_') or data.startswith('next_page_'):
-        # Навигация по страницам
-        meetings = context.user_data.get('view_meetings', [])
-        
-        if not meetings:
+        # Навигация по страницам (в callback_data - ключ крайней встречи)
+        if 'view_filters' not in context.user_data:
             await query.answer("Нет данных для отображения")
             return
         
-        if data.startswith('prev_page_'):
-            page = int(data.split('_')[2])
-        else:  # next_page_
-            page = int(data.split('_')[2]) + 1
-        
-        context.user_data['view_page'] = page
+        backward = data.startswith('prev_page_')
+        cursor = data[len('prev_page_'):] if backward else data[len('next_page_'):]
         
-        filters = context.user_data.get('view_filters', {})
-        year = filters.get('year', '')
-        month = filters.get('month', '')
-        
-        month_names = [
-            "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-            "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-        ]
-        month_name = month_names[month-1] if month else ""
-        
-        await query.edit_message_text(
-            f"📅 *{month_name} {year}*\n"
-            f"📋 *Найдено встреч:* {len(meetings)}\n\n"
-            "*Выберите встречу для просмотра деталей:*",
-            reply_markup=get_meetings_keyboard(meetings, page=page),
-            parse_mode='Markdown'
-        )
+        await show_meetings_page(query, context, cursor=cursor, backward=backward)
     
     elif data == 'back_to_years':
         # Возврат к выбору года
         await query.edit_message_text(
             "📅 *Выберите год для просмотра встреч:*",
-            reply_markup=get_years_keyboard(),
+            reply_markup=await get_years_keyboard(),
             parse_mode='Markdown'
         )
     
@@ -527,49 +581,115 @@ async def view_meetings_callback(update: Update, context):
             await query.edit_message_text(
                 f"📅 *Год:* {year}\n\n"
                 "*Выберите месяц:*",
-                reply_markup=get_months_keyboard(year),
+                reply_markup=await get_months_keyboard(year),
                 parse_mode='Markdown'
             )
     
     elif data == 'back_to_meetings':
-        # Возврат к списку встреч
-        meetings = context.user_data.get('view_meetings', [])
-        page = context.user_data.get('view_page', 0)
-        
-        if meetings:
-            filters = context.user_data.get('view_filters', {})
-            year = filters.get('year', '')
-            month = filters.get('month', '')
-            
-            month_names = [
-                "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-                "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-            ]
-            month_name = month_names[month-1] if month else ""
-            
-            await query.edit_message_text(
-                f"📅 *{month_name} {year}*\n"
-                f"📋 *Найдено встреч:* {len(meetings)}\n\n"
-                "*Выберите встречу для просмотра деталей:*",
-                reply_markup=get_meetings_keyboard(meetings, page=page),
-                parse_mode='Markdown'
-            )
+        # Возврат к списку встреч (или к результатам поиска)
+        if context.user_data.get('view_source') == 'search' and 'search_query' in context.user_data:
+            text, reply_markup = await build_search_page(context, context.user_data.get('search_page', 0))
+            await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+            return
+        
+        page = context.user_data.get('view_page')
+        
+        if page and 'view_filters' in context.user_data:
+            await show_meetings_page(query, context, **page)
+
+# === ПОИСК ВСТРЕЧ ===
+SEARCH_PAGE_SIZE = 10
+
+async def build_search_page(context, page=0):
+    """Текст и клавиатура страницы результатов поиска по сохраненному запросу"""
+    search_text = context.user_data['search_query']
+    results = await db.search_meetings(
+        search_text,
+        limit=SEARCH_PAGE_SIZE,
+        offset=page * SEARCH_PAGE_SIZE
+    )
+    
+    # Запоминаем страницу для возврата из деталей встречи
+    context.user_data['search_page'] = page
+    context.user_data['view_source'] = 'search'
+    
+    if not results['total']:
+        return (
+            f"🔎 По запросу «{html.escape(search_text)}» ничего не найдено.\n\n"
+            "Попробуйте другие слова.",
+            None
+        )
+    
+    search_text_html = html.escape(search_text)
+    lines = [
+        f"🔎 <b>Поиск:</b> {search_text_html}",
+        f"📋 <b>Найдено встреч:</b> {results['total']}",
+        ""
+    ]
+    
+    for number, meeting in enumerate(results['meetings'], start=page * SEARCH_PAGE_SIZE + 1):
+        # Выделяем совпадения во фрагменте (маркеры ставит ts_headline)
+        fragment = html.escape(meeting['headline'])
+        fragment = fragment.replace(HIGHLIGHT_START, "<b>").replace(HIGHLIGHT_STOP, "</b>")
+        date_str = meeting['meeting_date'].strftime('%d.%m.%Y')
+        
+        lines.append(f"{number}. {date_str} — {html.escape(meeting['oiv_name'])}")
+        lines.append(f"<i>{fragment}</i>")
+        lines.append("")
+    
+    lines.append("Выберите встречу для просмотра деталей:")
+    
+    return "\n".join(lines), get_search_keyboard(results, page)
+
+@require_role()
+async def search_command(update: Update, context):
+    """Обработка команды /search <слова>"""
+    search_text = " ".join(context.args).strip()
+    
+    if not search_text:
+        await update.message.reply_text(
+            "🔎 Использование: /search <слова>\n\n"
+            "Например: /search дорожное строительство"
+        )
+        return
+    
+    context.user_data['search_query'] = search_text
+    text, reply_markup = await build_search_page(context)
+    
+    await update.message.reply_text(
+        text,
+        reply_markup=reply_markup,
+        parse_mode='HTML'
+    )
+
+@require_role()
+async def search_callback(update: Update, context):
+    """Листание страниц результатов поиска"""
+    query = update.callback_query
+    await query.answer()
+    
+    if 'search_query' not in context.user_data:
+        await query.edit_message_text("Нет данных для отображения. Повторите поиск командой /search.")
+        return
+    
+    page = int(query.data.split('_')[2])
+    text, reply_markup = await build_search_page(context, page)
+    
+    await query.edit_message_text(
+        text,
+        reply_markup=reply_markup,
+        parse_mode='HTML'
+    )
 
 # === РЕДАКТИРОВАНИЕ ВСТРЕЧ (только для админа) ===
+@require_role('admin', "⛔ У вас нет прав для редактирования встреч.")
 async def edit_meeting_start(update: Update, context):
     """Начало редактирования встречи"""
     query = update.callback_query
     await query.answer()
     
-    # Проверяем права (должен быть админом)
-    if context.user_data.get('role') != 'admin':
-        await query.edit_message_text(
-            "⛔ У вас нет прав для редактирования встреч."
-        )
-        return
-    
     meeting_id = int(query.data.split('_')[1])
-    meeting = db.get_meeting(meeting_id)
+    meeting = await db.get_meeting(meeting_id)
     
     if not meeting:
         await query.edit_message_text("❌ Встреча не найдена.")
@@ -587,6 +707,7 @@ async def edit_meeting_start(update: Update, context):
     
     return EDIT_MEETING_FIELD
 
+@require_role('admin', "⛔ У вас нет прав для редактирования встреч.")
 async def edit_meeting_field(update: Update, context):
     """Выбор поля для редактирования"""
     query = update.callback_query
@@ -595,7 +716,7 @@ async def edit_meeting_field(update: Update, context):
     if query.data.startswith('cancel_edit_'):
         # Отмена редактирования
         meeting_id = int(query.data.split('_')[2])
-        meeting = db.get_meeting(meeting_id)
+        meeting = await db.get_meeting(meeting_id)
         
         # Показываем детали встречи снова
         date_str = meeting['meeting_date'].strftime('%d.%m.%Y')
@@ -637,14 +758,16 @@ async def edit_meeting_field(update: Update, context):
     context.user_data['editing_field'] = field
     context.user_data['editing_meeting_id'] = meeting_id
     
-    meeting = db.get_meeting(meeting_id)
+    meeting = await db.get_meeting(meeting_id)
     
     if field == 'date':
+        # ОИВ нужен для отметок в календаре при листании месяцев
+        context.user_data['editing_oiv_id'] = meeting['oiv_id']
         await query.edit_message_text(
             f"✏️ *Редактирование даты встречи #{meeting_id}*\n\n"
             "Текущая дата: " + meeting['meeting_date'].strftime('%d.%m.%Y') + "\n\n"
-            "Выберите новую дату:",
-            reply_markup=get_calendar_keyboard(),
+            "Выберите новую дату (• - дни со встречами с этим ОИВ):",
+            reply_markup=await get_meetings_calendar_keyboard(oiv_id=meeting['oiv_id']),
             parse_mode='Markdown'
         )
         return EDIT_MEETING_FIELD
@@ -686,6 +809,7 @@ async def edit_meeting_field(update: Update, context):
         )
         return EDIT_MEETING_FIELD
 
+@require_role('admin', "⛔ У вас нет прав для редактирования встреч.")
 async def edit_meeting_input(update: Update, context):
     """Обработка ввода новых данных для поля"""
     if update.message:
@@ -697,7 +821,7 @@ async def edit_meeting_input(update: Update, context):
             await update.message.reply_text("Ошибка: данные редактирования не найдены.")
             return ConversationHandler.END
         
-        meeting = db.get_meeting(meeting_id)
+        meeting = await db.get_meeting(meeting_id)
         
         if field == 'duration':
             # Проверяем, что введено число
@@ -709,7 +833,8 @@ async def edit_meeting_input(update: Update, context):
                 return EDIT_MEETING_FIELD
             
             duration = int(text)
-            db.update_meeting(meeting_id, duration_minutes=duration)
+            await db.update_meeting(meeting_id, duration_minutes=duration)
+            notify_admins(update, f"✏️ #{meeting_id} длительность: {duration} мин")
             
             await update.message.reply_text(
                 f"✅ Длительность обновлена: {duration} мин\n\n"
@@ -729,7 +854,8 @@ async def edit_meeting_input(update: Update, context):
                 )
                 return EDIT_MEETING_FIELD
             
-            db.update_meeting(meeting_id, summary=text)
+            await db.update_meeting(meeting_id, summary=text)
+            notify_admins(update, f"✏️ #{meeting_id} содержание изменено")
             
             await update.message.reply_text(
                 f"✅ Содержание обновлено.\n\n"
@@ -741,6 +867,7 @@ async def edit_meeting_input(update: Update, context):
             del context.user_data['editing_field']
             return EDIT_MEETING_FIELD
 
+@require_role('admin', "⛔ У вас нет прав для редактирования встреч.")
 async def edit_meeting_callback(update: Update, context):
     """Обработка callback при редактировании (дата, ОИВ, статус)"""
     query = update.callback_query
@@ -768,7 +895,8 @@ async def edit_meeting_callback(update: Update, context):
             date_str = query.data.split('_')[2]
             new_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             
-            db.update_meeting(meeting_id, meeting_date=new_date)
+            await db.update_meeting(meeting_id, meeting_date=new_date)
+            notify_admins(update, f"✏️ #{meeting_id} дата: {new_date.strftime('%d.%m.%Y')}")
             
             await query.edit_message_text(
                 f"✅ Дата обновлена: {new_date.strftime('%d.%m.%Y')}\n\n"
@@ -785,7 +913,9 @@ async def edit_meeting_callback(update: Update, context):
             await query.edit_message_text(
                 f"✏️ *Редактирование даты встречи #{meeting_id}*\n\n"
                 "Выберите новую дату:",
-                reply_markup=get_calendar_keyboard(int(year), int(month)),
+                reply_markup=await get_meetings_calendar_keyboard(
+                    int(year), int(month), oiv_id=context.user_data.get('editing_oiv_id')
+                ),
                 parse_mode='Markdown'
             )
             return EDIT_MEETING_FIELD
@@ -818,11 +948,12 @@ async def edit_meeting_callback(update: Update, context):
             # Выбор ОИВ
             oiv_id = int(query.data.split('_')[1])
             
-            db.update_meeting(meeting_id, oiv_id=oiv_id)
+            await db.update_meeting(meeting_id, oiv_id=oiv_id)
             
             # Получаем имя ОИВ для отображения
-            oiv = db.get_oiv(oiv_id)
+            oiv = reference.get_oiv(oiv_id)
             oiv_name = oiv['name'] if oiv else "неизвестно"
+            notify_admins(update, f"✏️ #{meeting_id} ОИВ: {html.escape(oiv_name)}")
             
             await query.edit_message_text(
                 f"✅ ОИВ обновлен: {oiv_name}\n\n"
@@ -843,7 +974,8 @@ async def edit_meeting_callback(update: Update, context):
             # Выбор статуса
             new_status = query.data.split('_')[1]
             
-            db.update_meeting(meeting_id, status=new_status)
+            await db.update_meeting(meeting_id, status=new_status)
+            notify_admins(update, f"✏️ #{meeting_id} статус: {html.escape(new_status)}")
             
             await query.edit_message_text(
                 f"✅ Статус обновлен: {new_status}\n\n"
@@ -854,22 +986,67 @@ async def edit_meeting_callback(update: Update, context):
             del context.user_data['editing_field']
             return EDIT_MEETING_FIELD
 
+# === НАПОМИНАНИЯ О ЗАПЛАНИРОВАННЫХ ВСТРЕЧАХ ===
+async def mark_reminder(query, meeting_id, line):
+    """Отметка в напоминании: строка с результатом дописывается к тексту,
+    кнопки этой встречи убираются, кнопки остальных встреч остаются"""
+    message = query.message
+    if not getattr(message, 'text', None):
+        # Сообщение недоступно боту (слишком старое) - просто заменяем текст
+        await query.edit_message_text(line, parse_mode='HTML')
+        return
+    
+    prefix = f"remind_{meeting_id}_"
+    rows = [
+        row for row in (message.reply_markup.inline_keyboard if message.reply_markup else ())
+        if not any((button.callback_data or '').startswith(prefix) for button in row)
+    ]
+    await query.edit_message_text(
+        f"{message.text_html}\n\n{line}",
+        parse_mode='HTML',
+        reply_markup=InlineKeyboardMarkup(rows) if rows else None
+    )
+
+@require_role()
+async def reminder_status_callback(update: Update, context):
+    """Итоговый статус встречи из напоминания (формат: "remind_123_Состоялась")"""
+    query = update.callback_query
+    await query.answer()
+    
+    _, meeting_id, status = query.data.split('_', 2)
+    meeting_id = int(meeting_id)
+    if status not in MEETING_STATUSES:
+        return
+    
+    meeting = await db.get_meeting(meeting_id)
+    if not meeting:
+        await mark_reminder(query, meeting_id, f"❌ Встреча #{meeting_id} не найдена.")
+        return
+    
+    # Статус может менять автор встречи или администратор
+    if meeting['user_id'] != update.effective_user.id and await get_role(update.effective_user.id) != 'admin':
+        await mark_reminder(query, meeting_id, f"⛔ У вас нет прав для изменения встречи #{meeting_id}.")
+        return
+    
+    await db.update_meeting(meeting_id, status=status)
+    notify_admins(update, f"✏️ #{meeting_id} статус: {html.escape(status)}")
+    
+    await mark_reminder(
+        query, meeting_id,
+        f"✅ Статус встречи #{meeting_id} ({html.escape(meeting['oiv_name'])}, "
+        f"{meeting['meeting_date'].strftime('%d.%m.%Y')}) обновлен: {html.escape(status)}"
+    )
+
 # === УДАЛЕНИЕ ВСТРЕЧ (только для админа) ===
+@require_role('admin', "⛔ У вас нет прав для удаления встреч.")
 async def delete_meeting_start(update: Update, context):
     """Начало удаления встречи"""
     query = update.callback_query
     await query.answer()
     
-    # Проверяем права (должен быть админом)
-    if context.user_data.get('role') != 'admin':
-        await query.edit_message_text(
-            "⛔ У вас нет прав для удаления встреч."
-        )
-        return
-    
     # Получаем ID встречи (формат: "delete_123")
     meeting_id = int(query.data.split('_')[1])
-    meeting = db.get_meeting(meeting_id)
+    meeting = await db.get_meeting(meeting_id)
     
     if not meeting:
         await query.edit_message_text("❌ Встреча не найдена.")
@@ -888,6 +1065,7 @@ async def delete_meeting_start(update: Update, context):
         parse_mode='Markdown'
     )
 
+@require_role('admin', "⛔ У вас нет прав для удаления встреч.")
 async def delete_meeting_confirm(update: Update, context):
     """Подтверждение удаления встречи"""
     query = update.callback_query
@@ -897,9 +1075,10 @@ async def delete_meeting_confirm(update: Update, context):
     meeting_id = int(query.data.split('_')[2])
     
     # Удаляем встречу
-    success = db.delete_meeting(meeting_id)
+    success = await db.delete_meeting(meeting_id)
     
     if success:
+        notify_admins(update, f"🗑 #{meeting_id} удалена")
         await query.edit_message_text(
             f"✅ Встреча #{meeting_id} успешно удалена.\n\n"
             "Вы можете продолжить просмотр других встреч."
@@ -910,6 +1089,7 @@ async def delete_meeting_confirm(update: Update, context):
             "Попробуйте снова или обратитесь к разработчику."
         )
 
+@require_role('admin', "⛔ У вас нет прав для удаления встреч.")
 async def delete_meeting_cancel(update: Update, context):
     """Отмена удаления встречи"""
     query = update.callback_query
@@ -917,7 +1097,7 @@ async def delete_meeting_cancel(update: Update, context):
     
     # Отмена удаления (формат: "delete_cancel_123")
     meeting_id = int(query.data.split('_')[2])
-    meeting = db.get_meeting(meeting_id)
+    meeting = await db.get_meeting(meeting_id)
     
     if not meeting:
         await query.edit_message_text("❌ Встреча не найдена.")
@@ -946,15 +1126,9 @@ async def delete_meeting_cancel(update: Update, context):
         parse_mode='Markdown'
     )
 # === УПРАВЛЕНИЕ ПОЛЬЗОВАТЕЛЯМИ (только для админа) ===
+@require_role('admin', "⛔ У вас нет прав для управления пользователями.")
 async def admin_users_start(update: Update, context):
     """Начало управления пользователями"""
-    # Проверяем права (должен быть админом)
-    if context.user_data.get('role') != 'admin':
-        await update.message.reply_text(
-            "⛔ У вас нет прав для управления пользователями."
-        )
-        return
-    
     await update.message.reply_text(
         "👥 *Управление пользователями*\n\n"
         "Выберите действие:",
@@ -962,6 +1136,7 @@ async def admin_users_start(update: Update, context):
         parse_mode='Markdown'
     )
 
+@require_role('admin', "⛔ У вас нет прав для управления пользователями.")
 async def admin_users_callback(update: Update, context):
     """Обработка callback для управления пользователями"""
     query = update.callback_query
@@ -971,7 +1146,7 @@ async def admin_users_callback(update: Update, context):
     
     if data == 'admin_list_users':
         # Список всех пользователей
-        users = db.get_all_users()
+        users = await db.get_all_users()
         
         if not users:
             await query.edit_message_text("👥 Пользователей пока нет.")
@@ -1018,6 +1193,7 @@ async def admin_users_callback(update: Update, context):
             reply_markup=get_main_menu('admin')
         )
 
+@require_role('admin', "⛔ У вас нет прав для управления пользователями.")
 async def admin_add_user_id(update: Update, context):
     """Обработка ввода ID пользователя для добавления"""
     if update.message:
@@ -1034,7 +1210,7 @@ async def admin_add_user_id(update: Update, context):
         telegram_id = int(telegram_id)
         
         # Проверяем, нет ли уже такого пользователя
-        existing_user = db.get_user(telegram_id)
+        existing_user = await db.get_user(telegram_id)
         if existing_user:
             await update.message.reply_text(
                 f"❌ Пользователь с ID {telegram_id} уже существует.\n\n"
@@ -1052,6 +1228,7 @@ async def admin_add_user_id(update: Update, context):
         
         return ADMIN_ADD_USER_NAME
 
+@require_role('admin', "⛔ У вас нет прав для управления пользователями.")
 async def admin_add_user_name(update: Update, context):
     """Обработка ввода имени пользователя"""
     if update.message:
@@ -1074,7 +1251,8 @@ async def admin_add_user_name(update: Update, context):
         
         # Добавляем пользователя
         try:
-            db.add_user(telegram_id, user_name, role='user')
+            await db.add_user(telegram_id, user_name, role='user')
+            user_cache.invalidate(telegram_id)
             
             await update.message.reply_text(
                 f"✅ Пользователь успешно добавлен!\n\n"
@@ -1100,6 +1278,7 @@ async def admin_add_user_name(update: Update, context):
         
         return ConversationHandler.END
 
+@require_role('admin', "⛔ У вас нет прав для управления пользователями.")
 async def admin_delete_user_input(update: Update, context):
     """Обработка ввода ID пользователя для удаления"""
     if update.message:
@@ -1116,7 +1295,7 @@ async def admin_delete_user_input(update: Update, context):
         telegram_id = int(telegram_id)
         
         # Проверяем, существует ли пользователь
-        user = db.get_user(telegram_id)
+        user = await db.get_user(telegram_id)
         if not user:
             await update.message.reply_text(
                 f"❌ Пользователь с ID {telegram_id} не найден.\n\n"
@@ -1133,7 +1312,8 @@ async def admin_delete_user_input(update: Update, context):
             return ADMIN_DELETE_USER
         
         # Удаляем пользователя
-        success = db.delete_user(telegram_id)
+        success = await db.delete_user(telegram_id)
+        user_cache.invalidate(telegram_id)
         
         if success:
             await update.message.reply_text(
@@ -1148,110 +1328,316 @@ async def admin_delete_user_input(update: Update, context):
         
         return ConversationHandler.END
 
-# === СТАТИСТИКА (только для админа) ===
-async def show_statistics(update: Update, context):
-    """Показ статистики по встречам"""
-    # Проверяем права (должен быть админом)
-    if context.user_data.get('role') != 'admin':
+# === ИМПОРТ ВСТРЕЧ (только для админа) ===
+@require_role('admin', "⛔ У вас нет прав для импорта встреч.")
+async def import_document(update: Update, context):
+    """Импорт встреч из присланного файла CSV/XLSX"""
+    document = update.message.document
+    await update.message.reply_text(f"⏳ Импорт файла {document.file_name}...")
+    
+    try:
+        file = await document.get_file()
+        content = bytes(await file.download_as_bytearray())
+        
+        imported, errors = await import_meetings(
+            content,
+            document.file_name,
+            default_user_id=update.effective_user.id,
+            default_user_name=update.effective_user.full_name
+        )
+    except ImportFormatError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    except Exception as e:
+        logger.error(f"Ошибка при импорте встреч: {e}")
         await update.message.reply_text(
-            "⛔ У вас нет прав для просмотра статистики."
+            "❌ Произошла ошибка при импорте встреч.\n"
+            "Ни одна встреча не загружена."
         )
         return
     
-    # Получаем статистику
-    stats = db.get_statistics()
-    
-    if not stats:
+    if errors:
         await update.message.reply_text(
-            "📊 Статистика пока недоступна.\n"
-            "Добавьте несколько встреч для анализа."
+            f"❌ Найдено ошибок: {len(errors)}. Ни одна встреча не загружена.\n\n"
+            f"{format_import_errors(errors)}\n\n"
+            "Исправьте файл и отправьте его снова."
         )
         return
     
-    # Группируем статистику
-    complex_stats = {}
-    for row in stats:
-        complex_name = row['complex_name']
-        if complex_name not in complex_stats:
-            complex_stats[complex_name] = {
-                'total': 0,
-                'by_status': {},
-                'by_oiv': {}
-            }
-        
-        # Общее количество
-        complex_stats[complex_name]['total'] += row['count']
-        
-        # По статусам
-        status = row['status']
-        if status not in complex_stats[complex_name]['by_status']:
-            complex_stats[complex_name]['by_status'][status] = 0
-        complex_stats[complex_name]['by_status'][status] += row['count']
-        
-        # По ОИВ
-        oiv_name = row['oiv_name']
-        if oiv_name not in complex_stats[complex_name]['by_oiv']:
-            complex_stats[complex_name]['by_oiv'][oiv_name] = {
-                'total': 0,
-                'by_status': {}
-            }
-        
-        complex_stats[complex_name]['by_oiv'][oiv_name]['total'] += row['count']
-        
-        if status not in complex_stats[complex_name]['by_oiv'][oiv_name]['by_status']:
-            complex_stats[complex_name]['by_oiv'][oiv_name]['by_status'][status] = 0
-        complex_stats[complex_name]['by_oiv'][oiv_name]['by_status'][status] += row['count']
-    
-    # Формируем текст статистики
-    stats_text = "📊 *Статистика встреч*\n\n"
-    
-    for complex_name, data in complex_stats.items():
-        stats_text += f"🏛️ *{complex_name}*\n"
-        stats_text += f"   Всего встреч: {data['total']}\n"
+    await update.message.reply_text(f"✅ Импортировано встреч: {imported}")
+
+# === ЭКСПОРТ ВСТРЕЧ (только для админа) ===
+EXPORT_USAGE = (
+    "📤 Использование: /export [год=2024] [месяц=3] [комплекс=1] [оив=ДГИ] [статус=Состоялась]\n\n"
+    "Все фильтры необязательны. Значения с пробелами заключайте в кавычки."
+)
+
+def parse_export_filters(args):
+    """Разбор аргументов /export вида ключ=значение в фильтры встреч"""
+    filters = {}
+    
+    try:
+        args = shlex.split(" ".join(args))
+    except ValueError:
+        raise ValueError("Незакрытая кавычка в аргументах")
+    
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        key = key.strip().lower()
+        value = value.strip()
+        if not sep or not value:
+            raise ValueError(f"Неверный аргумент «{arg}»")
+        
+        if key in ('год', 'year'):
+            if not (value.isascii() and value.isdigit()):
+                raise ValueError(f"Год «{value}» должен быть числом")
+            filters['year'] = int(value)
+        elif key in ('месяц', 'month'):
+            if not (value.isascii() and value.isdigit()):
+                raise ValueError(f"Месяц «{value}» должен быть числом")
+            filters['month'] = int(value)
+            if not 1 <= filters['month'] <= 12:
+                raise ValueError("Месяц должен быть от 1 до 12")
+        elif key in ('комплекс', 'complex'):
+            # Номер комплекса или начало его названия
+            complexes = reference.get_complexes()
+            matches = [
+                c for c in complexes
+                if c['name'].split('.')[0] == value or c['name'].lower().startswith(value.lower())
+            ]
+            if not matches:
+                raise ValueError(f"Комплекс «{value}» не найден")
+            filters['complex_id'] = matches[0]['id']
+        elif key in ('оив', 'oiv'):
+            # Точное название, иначе ближайшее похожее
+            oiv = reference.get_oiv_by_name(value)
+            if not oiv:
+                matches = oiv_index.search(value, limit=1)
+                if not matches:
+                    raise ValueError(f"ОИВ «{value}» не найден")
+                oiv = matches[0][1]
+            filters['oiv_id'] = oiv['id']
+        elif key in ('статус', 'status'):
+            status = value.capitalize()
+            if status not in MEETING_STATUSES:
+                raise ValueError(f"Неизвестный статус «{value}»")
+            filters['status'] = status
+        else:
+            raise ValueError(f"Неизвестный фильтр «{key}»")
+    
+    return filters
+
+@require_role('admin', "⛔ У вас нет прав для экспорта встреч.")
+async def export_command(update: Update, context):
+    """Обработка команды /export: выгрузка встреч в CSV (gzip)"""
+    try:
+        filters = parse_export_filters(context.args)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}\n\n{EXPORT_USAGE}")
+        return
+    
+    await update.message.reply_text("⏳ Формирую выгрузку...")
+    
+    try:
+        path, count = await export_meetings(filters)
+    except Exception as e:
+        logger.error(f"Ошибка при экспорте встреч: {e}")
+        await update.message.reply_text("❌ Произошла ошибка при экспорте встреч.")
+        return
+    
+    try:
+        if not count:
+            await update.message.reply_text("📭 Нет встреч по заданным фильтрам.")
+            return
+        
+        with open(path, 'rb') as f:
+            await update.message.reply_document(
+                document=f,
+                filename=export_filename(filters),
+                caption=f"📤 Выгружено встреч: {count}"
+            )
+    finally:
+        os.remove(path)
+
+# === СТАТИСТИКА (только для админа) ===
+def format_statistics(summary, title="📊 *Статистика встреч*"):
+    """Формирование текста статистики из db.get_statistics_summary"""
+    stats_text = f"{title}\n\n"
+    
+    for complex_stats in summary['complexes']:
+        stats_text += f"🏛️ *{complex_stats['name']}*\n"
+        stats_text += f"   Всего встреч: {complex_stats['total']}\n"
         
         # Статистика по статусам
-        if data['by_status']:
+        if complex_stats['by_status']:
             stats_text += "   По статусам:\n"
-            for status, count in data['by_status'].items():
+            for status, count in sorted(complex_stats['by_status'].items()):
                 stats_text += f"     {status}: {count}\n"
         
-        # Топ ОИВ (первые 3)
-        top_oivs = sorted(
-            data['by_oiv'].items(),
-            key=lambda x: x[1]['total'],
-            reverse=True
-        )[:3]
-        
-        if top_oivs:
+        # Топ ОИВ (уже отобраны в SQL)
+        if complex_stats['top_oivs']:
             stats_text += "   Топ ОИВ:\n"
-            for oiv_name, oiv_data in top_oivs:
-                stats_text += f"     {oiv_name}: {oiv_data['total']} встреч\n"
+            for oiv in complex_stats['top_oivs']:
+                stats_text += f"     {oiv['name']}: {oiv['count']} встреч\n"
         
         stats_text += "\n"
     
     # Общая статистика
-    total_meetings = sum(data['total'] for data in complex_stats.values())
     stats_text += f"📈 *Общая статистика:*\n"
-    stats_text += f"   Всего встреч в системе: {total_meetings}\n"
-    stats_text += f"   Всего комплексов: {len(complex_stats)}\n"
+    stats_text += f"   Всего встреч в системе: {summary['total']}\n"
+    stats_text += f"   Всего комплексов: {len(summary['complexes'])}\n"
     
-    # Получаем последнюю встречу
-    all_meetings = db.get_all_meetings()
-    if all_meetings:
-        last_meeting = all_meetings[0]
+    # Последняя встреча
+    last_meeting = summary['latest']
+    if last_meeting:
         last_date = last_meeting['meeting_date'].strftime('%d.%m.%Y')
         stats_text += f"   Последняя встреча: {last_date} ({last_meeting['oiv_name']})\n"
     
+    return stats_text
+
+def get_statistics_period(period, today=None):
+    """Границы периода статистики (начало, конец) и его название"""
+    today = today or datetime.now(TIMEZONE).date()
+    quarter_start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+    month_start = today.replace(day=1)
+    
+    if period == 'week':
+        return today - relativedelta(days=today.weekday()), today, "эту неделю"
+    elif period == 'month':
+        return month_start, today, "этот месяц"
+    elif period == 'quarter':
+        return quarter_start, today, "этот квартал"
+    elif period == 'year':
+        return date(today.year, 1, 1), today, "этот год"
+    elif period == 'prevmonth':
+        return month_start - relativedelta(months=1), month_start - relativedelta(days=1), "прошлый месяц"
+    elif period == 'prevquarter':
+        return quarter_start - relativedelta(months=3), quarter_start - relativedelta(days=1), "прошлый квартал"
+    
+    return None, None, "всё время"
+
+async def send_period_statistics(query, start_date, end_date, period_name):
+    """Показ статистики за период с клавиатурой выбора другого периода"""
+    summary = await db.get_period_statistics(start_date, end_date)
+    
+    title = f"📊 *Статистика за {period_name}*"
+    if start_date and end_date:
+        title += f"\n{start_date.strftime('%d.%m.%Y')} – {end_date.strftime('%d.%m.%Y')}"
+    
+    if not summary['total']:
+        await query.edit_message_text(
+            f"{title}\n\n📭 За этот период встреч нет.\n\n"
+            "Выберите другой период:",
+            reply_markup=get_statistics_period_keyboard(),
+            parse_mode='Markdown'
+        )
+        return
+    
+    await query.edit_message_text(
+        format_statistics(summary, title),
+        reply_markup=get_statistics_period_keyboard(),
+        parse_mode='Markdown'
+    )
+
+@require_role('admin', "⛔ У вас нет прав для просмотра статистики.")
+async def show_statistics(update: Update, context):
+    """Показ статистики по встречам: выбор периода"""
     await update.message.reply_text(
-        stats_text,
+        "📊 *Статистика встреч*\n\n"
+        "Выберите период:",
+        reply_markup=get_statistics_period_keyboard(),
+        parse_mode='Markdown'
+    )
+
+@require_role('admin', "⛔ У вас нет прав для просмотра статистики.")
+async def statistics_period_callback(update: Update, context):
+    """Обработка выбора готового периода статистики"""
+    query = update.callback_query
+    await query.answer()
+    
+    period = query.data[len('stats_period_'):]
+    start_date, end_date, period_name = get_statistics_period(period)
+    
+    # Вся агрегация выполняется в БД, закрытые периоды - из кэша
+    await send_period_statistics(query, start_date, end_date, period_name)
+
+@require_role('admin', "⛔ У вас нет прав для просмотра статистики.")
+async def statistics_custom_start(update: Update, context):
+    """Начало выбора произвольного периода статистики"""
+    query = update.callback_query
+    await query.answer()
+    
+    context.user_data.pop('stats_start', None)
+    
+    await query.edit_message_text(
+        "🗓️ *Выберите начало периода:*",
+        reply_markup=get_calendar_keyboard(prefix="stats_cal"),
         parse_mode='Markdown'
     )
+    
+    return STATS_SELECT_START
+
+@require_role('admin', "⛔ У вас нет прав для просмотра статистики.")
+async def statistics_custom_date(update: Update, context):
+    """Выбор границ произвольного периода на календаре"""
+    query = update.callback_query
+    await query.answer()
+    
+    selecting_start = 'stats_start' not in context.user_data
+    prompt = "🗓️ *Выберите начало периода:*" if selecting_start else "🗓️ *Выберите конец периода:*"
+    current_state = STATS_SELECT_START if selecting_start else STATS_SELECT_END
+    
+    if query.data == 'stats_cal_cancel':
+        # Отмена - возвращаемся к выбору периода
+        context.user_data.pop('stats_start', None)
+        await query.edit_message_text(
+            "📊 *Статистика встреч*\n\n"
+            "Выберите период:",
+            reply_markup=get_statistics_period_keyboard(),
+            parse_mode='Markdown'
+        )
+        return ConversationHandler.END
+    
+    if query.data == 'stats_cal_today':
+        selected_date = datetime.now(TIMEZONE).date()
+    elif query.data.startswith('stats_cal_day_'):
+        selected_date = datetime.strptime(query.data[len('stats_cal_day_'):], '%Y-%m-%d').date()
+    elif query.data.startswith('stats_cal_nav_'):
+        # Навигация по месяцам
+        year, month = query.data[len('stats_cal_nav_'):].split('_')
+        await query.edit_message_text(
+            prompt,
+            reply_markup=get_calendar_keyboard(int(year), int(month), prefix="stats_cal"),
+            parse_mode='Markdown'
+        )
+        return current_state
+    else:
+        # Игнорируем другие callback_data
+        return current_state
+    
+    if selecting_start:
+        context.user_data['stats_start'] = selected_date
+        await query.edit_message_text(
+            f"🗓️ *Начало периода:* {selected_date.strftime('%d.%m.%Y')}\n\n"
+            "*Выберите конец периода:*",
+            reply_markup=get_calendar_keyboard(selected_date.year, selected_date.month, prefix="stats_cal"),
+            parse_mode='Markdown'
+        )
+        return STATS_SELECT_END
+    
+    # Выбран конец периода - показываем статистику
+    start_date = context.user_data.pop('stats_start')
+    start_date, end_date = sorted((start_date, selected_date))
+    
+    await send_period_statistics(query, start_date, end_date, "период")
+    
+    return ConversationHandler.END
 
 # === ОБРАБОТКА ТЕКСТОВЫХ СООБЩЕНИЙ ===
 async def handle_text(update: Update, context):
     """Обработка текстовых сообщений (кнопки главного меню)"""
     text = update.message.text
-    user_role = context.user_data.get('role', 'user')
+    user_role = await get_role(update.effective_user.id) or 'user'
     
     if text == "➕ Добавить встречу":
         # Начинаем процесс добавления встречи
@@ -1278,7 +1664,7 @@ async def handle_text(update: Update, context):
 # === ОТМЕНА ДИАЛОГА ===
 async def cancel(update: Update, context):
     """Отмена любого диалога"""
-    user_role = context.user_data.get('role', 'user')
+    user_role = await get_role(update.effective_user.id) or 'user'
     
     await update.message.reply_text(
         "Действие отменено.",
@@ -1286,63 +1672,162 @@ async def cancel(update: Update, context):
     )
     
     # Очищаем все временные данные
-    for key in ['new_meeting', 'editing_meeting_id', 'editing_field', 
-                'editing_complex_id', 'new_user_id', 
-                'view_year', 'view_filters', 'view_meetings', 'view_page']:
+    clear_dialog_data(context.user_data)
+    for key in ['view_year', 'view_filters', 'view_total', 'view_page',
+                'view_source', 'search_query', 'search_page']:
         if key in context.user_data:
             del context.user_data[key]
     
     return ConversationHandler.END
 
+async def conversation_timeout(update: Update, context):
+    """Очистка данных диалога, брошенного без завершения"""
+    clear_dialog_data(context.user_data)
+
+# === ЗАПУСК И ОСТАНОВКА ===
+async def post_init(application: Application):
+    """Открытие пула соединений с БД после инициализации приложения"""
+    await db.connect()
+    
+    # Миграции применяет init_db.py при деплое, здесь только проверяем версию схемы
+    await db.check_schema(LATEST_VERSION)
+    
+    # Справочники комплексов и ОИВ (вместе с индексом поиска ОИВ по названию)
+    await reference.load()
+    reference.start()
+    
+    # Рассылка уведомлений администраторам
+    notifier.start(application.bot)
+
+async def post_stop(application: Application):
+    """Доставка оставшихся уведомлений, пока бот еще может отправлять сообщения"""
+    await notifier.stop()
+
+async def post_shutdown(application: Application):
+    """Закрытие пула соединений с БД при остановке приложения"""
+    await reference.stop()
+    await db.close()
+
+# Обновления, которые бот обрабатывает (остальные Telegram не присылает)
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
 # === ОСНОВНАЯ ФУНКЦИЯ ===
-def main():
-    """Основная функция запуска бота"""
+def build_application():
+    """Создание приложения и регистрация обработчиков"""
     # Создаем приложение с явным указанием контекста
     context_types = ContextTypes()
-    application = Application.builder().token(BOT_TOKEN).context_types(context_types).build()
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .context_types(context_types)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .persistence(PostgresPersistence(update_interval=PERSISTENCE_UPDATE_INTERVAL))
+        .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES))
+    )
+    if TELEGRAM_API_URL:
+        builder = (
+            builder
+            .base_url(TELEGRAM_API_URL.rstrip('/') + '/bot')
+            .base_file_url(TELEGRAM_API_URL.rstrip('/') + '/file/bot')
+        )
+    application = builder.build()
+    
+    # Учет активности пользователей и вытеснение неактивных из памяти
+    application.add_handler(TypeHandler(Update, track_activity), group=-100)
+    application.job_queue.run_repeating(
+        evict_idle_sessions,
+        interval=SESSION_CLEANUP_INTERVAL,
+        first=SESSION_CLEANUP_INTERVAL
+    )
+    
+    # Ежедневные напоминания о запланированных встречах
+    application.job_queue.run_daily(send_meeting_reminders, time=REMINDER_TIME)
+    
+    # Сводка изменений для администраторов
+    application.job_queue.run_daily(send_admin_digest, time=DIGEST_TIME, days=DIGEST_DAYS)
     
     # Добавляем обработчик команды /start
     application.add_handler(CommandHandler("start", start))
     
+    # Полнотекстовый поиск по содержанию встреч
+    application.add_handler(CommandHandler("search", search_command))
+    application.add_handler(CommandHandler("export", export_command))
+    application.add_handler(CallbackQueryHandler(search_callback, pattern="^search_page_"))
+    
     # Добавляем обработчик для добавления встречи (диалог)
     conv_handler_add_meeting = ConversationHandler(
+        name="add_meeting",
+        persistent=True,
         entry_points=[MessageHandler(filters.Text("➕ Добавить встречу"), add_meeting_start)],
         states={
-            SELECT_COMPLEX: [CallbackQueryHandler(select_complex)],
+            SELECT_COMPLEX: [
+                CallbackQueryHandler(select_complex),
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND & ~filters.Text(MAIN_MENU_BUTTONS),
+                    search_oiv_text
+                )
+            ],
             SELECT_OIV: [CallbackQueryHandler(select_oiv)],
             SELECT_DATE: [CallbackQueryHandler(select_date)],
             SELECT_STATUS: [CallbackQueryHandler(select_status)],
             INPUT_DURATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, input_duration)],
             INPUT_SUMMARY: [MessageHandler(filters.TEXT & ~filters.COMMAND, input_summary)],
             CONFIRM_MEETING: [CallbackQueryHandler(confirm_meeting)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, conversation_timeout)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        conversation_timeout=CONVERSATION_TIMEOUT,
         allow_reentry=True
     )
     
     # Добавляем обработчик для редактирования встречи
     conv_handler_edit_meeting = ConversationHandler(
+        name="edit_meeting",
+        persistent=True,
         entry_points=[CallbackQueryHandler(edit_meeting_start, pattern="^edit_")],
         states={
             EDIT_MEETING_FIELD: [
                 CallbackQueryHandler(edit_meeting_field, pattern="^edit_field_"),
                 CallbackQueryHandler(edit_meeting_callback),
                 MessageHandler(filters.TEXT & ~filters.COMMAND, edit_meeting_input)
-            ]
+            ],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, conversation_timeout)]
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        conversation_timeout=CONVERSATION_TIMEOUT,
         allow_reentry=True
     )
     
     # Добавляем обработчик для управления пользователями (админ)
     conv_handler_admin_users = ConversationHandler(
+        name="admin_users",
+        persistent=True,
         entry_points=[CallbackQueryHandler(admin_users_callback, pattern="^admin_")],
         states={
             ADMIN_ADD_USER_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_add_user_id)],
             ADMIN_ADD_USER_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_add_user_name)],
-            ADMIN_DELETE_USER: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_delete_user_input)]
+            ADMIN_DELETE_USER: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_delete_user_input)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, conversation_timeout)]
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        conversation_timeout=CONVERSATION_TIMEOUT,
+        allow_reentry=True
+    )
+    
+    # Добавляем обработчик для выбора произвольного периода статистики (админ)
+    conv_handler_statistics_period = ConversationHandler(
+        name="statistics_period",
+        persistent=True,
+        entry_points=[CallbackQueryHandler(statistics_custom_start, pattern="^stats_period_custom$")],
+        states={
+            STATS_SELECT_START: [CallbackQueryHandler(statistics_custom_date, pattern="^stats_cal_")],
+            STATS_SELECT_END: [CallbackQueryHandler(statistics_custom_date, pattern="^stats_cal_")],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, conversation_timeout)]
+        },
+        fallbacks=[CommandHandler("cancel", cancel)],
+        conversation_timeout=CONVERSATION_TIMEOUT,
         allow_reentry=True
     )
     
@@ -1350,26 +1835,73 @@ def main():
     application.add_handler(conv_handler_add_meeting)
     application.add_handler(conv_handler_edit_meeting)
     application.add_handler(conv_handler_admin_users)
+    application.add_handler(conv_handler_statistics_period)
+    
+    # Обработчик готовых периодов статистики
+    application.add_handler(CallbackQueryHandler(statistics_period_callback, pattern="^stats_period_"))
     
     # Обработчики для просмотра встреч
     application.add_handler(CallbackQueryHandler(view_meetings_callback, pattern="^(year_|month_|meeting_|prev_page_|next_page_|back_to_)"))
     
+    # Итоговый статус встречи из напоминания
+    application.add_handler(CallbackQueryHandler(reminder_status_callback, pattern="^remind_"))
+    
     # Обработчики для удаления встреч (три отдельных)
     application.add_handler(CallbackQueryHandler(delete_meeting_start, pattern="^delete_[0-9]+$"))  # delete_123
     application.add_handler(CallbackQueryHandler(delete_meeting_confirm, pattern="^delete_confirm_"))  # delete_confirm_123
     application.add_handler(CallbackQueryHandler(delete_meeting_cancel, pattern="^delete_cancel_"))  # delete_cancel_123
     
+    # Импорт встреч из присланных файлов (админ)
+    application.add_handler(MessageHandler(
+        filters.Document.FileExtension("csv") | filters.Document.FileExtension("xlsx"),
+        import_document
+    ))
+    
     # Обработчик текстовых сообщений (кнопки главного меню)
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
     
     # Обработчик неизвестных команд
     application.add_handler(MessageHandler(filters.COMMAND, start))
     
-    # Запускаем бота ПРОСТО
-    print("Бот запущен...")
-    application.run_polling(
-        drop_pending_updates=True,
-        allowed_updates=Update.ALL_TYPES
+    # Метрики: время работы всех обработчиков и размеры кэшей
+    instrument_handlers(application)
+    register_cache_gauges()
+    
+    return application
+
+def register_cache_gauges():
+    """Метрики размеров кэшей процесса"""
+    keyboard_caches = [
+        get_main_menu, build_complexes_keyboard, build_oivs_keyboard, get_status_keyboard,
+        get_confirmation_keyboard, get_users_admin_keyboard, get_statistics_period_keyboard,
+        build_calendar_keyboard
+    ]
+    register_cache_gauge('reference_complexes', lambda: len(reference.complexes))
+    register_cache_gauge('reference_oivs', lambda: len(reference.oivs_by_id))
+    register_cache_gauge('users', lambda: len(user_cache.users))
+    register_cache_gauge('sessions', lambda: len(last_activity))
+    register_cache_gauge(
+        'keyboards', lambda: sum(cache.cache_info().currsize for cache in keyboard_caches)
     )
+    register_cache_gauge('admin_notifications', lambda: notifier.queue.qsize())
+
+def main():
+    """Основная функция запуска бота"""
+    application = build_application()
+    
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    
+    if WEBHOOK_URL:
+        # На Render бот работает как web-сервис: webhook и /healthz на одном порту
+        print("Бот запущен (webhook)...")
+        asyncio.run(run_webhook(application, ALLOWED_UPDATES))
+    else:
+        print("Бот запущен (polling)...")
+        application.run_polling(
+            drop_pending_updates=True,
+            allowed_updates=ALLOWED_UPDATES
+        )
+
 if __name__ == '__main__':
     main()
@@ -1,4 +1,6 @@
 import os
+from datetime import time
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,3 +28,55 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 
 # ID администратора (ваш Telegram ID)
 ADMIN_IDS = list(map(int, os.getenv('ADMIN_IDS', '').split(','))) if os.getenv('ADMIN_IDS') else []
+
+
+# Размер пула соединений с базой данных
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+
+# Время жизни кэша пользователей и ролей, секунд
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))
+
+# Как часто сохранять состояние диалогов и user_data в БД, секунд
+PERSISTENCE_UPDATE_INTERVAL = int(os.getenv('PERSISTENCE_UPDATE_INTERVAL', '30'))
+
+# Ограничения состояния пользователей в памяти:
+# таймаут незавершенного диалога, время до вытеснения неактивного пользователя,
+# максимум пользователей в памяти и период проверки (секунды)
+CONVERSATION_TIMEOUT = int(os.getenv('CONVERSATION_TIMEOUT', '1800'))
+SESSION_IDLE_TIMEOUT = int(os.getenv('SESSION_IDLE_TIMEOUT', '21600'))
+SESSION_MAX_USERS = int(os.getenv('SESSION_MAX_USERS', '1000'))
+SESSION_CLEANUP_INTERVAL = int(os.getenv('SESSION_CLEANUP_INTERVAL', '600'))
+
+# Режим webhook: включается, если известен внешний адрес сервиса
+# (на Render он приходит в RENDER_EXTERNAL_URL), иначе бот работает через polling
+WEBHOOK_URL = os.getenv('WEBHOOK_URL') or os.getenv('RENDER_EXTERNAL_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+# Если секрет не задан, он генерируется при каждом запуске (webhook тоже ставится при запуске)
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+PORT = int(os.getenv('PORT', '8000'))
+
+# Сколько обновлений разных пользователей обрабатывать параллельно
+# (каждое держит соединение из пула, поэтому не больше DB_POOL_MAX_SIZE)
+CONCURRENT_UPDATES = min(int(os.getenv('CONCURRENT_UPDATES', '8')), DB_POOL_MAX_SIZE)
+
+# Часовой пояс расписания и время ежедневных напоминаний о запланированных встречах (ЧЧ:ММ)
+TIMEZONE = ZoneInfo(os.getenv('TIMEZONE', 'Europe/Moscow'))
+REMINDER_TIME = time.fromisoformat(os.getenv('REMINDER_TIME', '09:00')).replace(tzinfo=TIMEZONE)
+
+# Сводка изменений для администраторов: время (ЧЧ:ММ) и дни недели (0 - воскресенье, ..., 6 - суббота)
+DIGEST_TIME = time.fromisoformat(os.getenv('DIGEST_TIME', '18:00')).replace(tzinfo=TIMEZONE)
+DIGEST_DAYS = tuple(int(day) for day in os.getenv('DIGEST_DAYS', '0,1,2,3,4,5,6').split(','))
+
+# Порт метрик Prometheus (слушает только 127.0.0.1), 0 - не запускать
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# Журнал медленных запросов: порог в миллисекундах (0 - отключить),
+# доля медленных SELECT, для которых сохраняется план EXPLAIN ANALYZE, и файл планов
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', '500'))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', '0'))
+SLOW_QUERY_PLAN_FILE = os.getenv('SLOW_QUERY_PLAN_FILE', 'slow_query_plans.log')
+
+# Адрес Bot API (локальный Bot API сервер или поддельный сервер нагрузочного теста),
+# по умолчанию - api.telegram.org
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
@@ -1,191 +1,537 @@
-import psycopg
+from contextlib import asynccontextmanager
+from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg.errors import UndefinedTable
 from psycopg.rows import dict_row
-from config import DB_CONFIG
-from datetime import datetime
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+from config import DB_CONFIG, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, TIMEZONE
+from metrics import instrument_class
+from query_log import SlowQueryCursor
+from datetime import date, datetime, timedelta
 
+def month_range(year, month=None):
+    """Полуинтервал дат [начало, конец) для года или месяца года"""
+    if month:
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    else:
+        start = date(year, 1, 1)
+        end = date(year + 1, 1, 1)
+    return start, end
+
+# Столбцы встречи без служебных (например, поискового summary_tsv)
+MEETING_COLUMNS = """
+    m.id, m.user_id, m.user_name, m.oiv_id, m.meeting_date, m.status,
+    m.duration_minutes, m.summary, m.created_at
+"""
+
+# Статус встреч, о которых бот напоминает автору
+MEETING_STATUS_PLANNED = "Запланирована"
+
+# Маркеры совпадений в ts_headline (заменяются на теги при выводе)
+HIGHLIGHT_START = "⟦"
+HIGHLIGHT_STOP = "⟧"
+
+# Время и исход каждого запроса учитываются в метриках (метка query - имя метода)
+@instrument_class
 class Database:
     def __init__(self):
-        self.conn = None
-        self.connect()
+        if 'dsn' in DB_CONFIG:
+            # Используем строку подключения
+            conninfo = DB_CONFIG['dsn']
+        else:
+            # Используем отдельные параметры
+            conninfo = make_conninfo(**DB_CONFIG)
+        self.conninfo = conninfo
+        
+        # Пул открывается в connect(), когда уже запущен цикл событий
+        self.pool = AsyncConnectionPool(
+            conninfo,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            # Медленные запросы пишутся в журнал (см. query_log.py)
+            kwargs={'cursor_factory': SlowQueryCursor},
+            open=False
+        )
     
-    def connect(self):
-        """Установка соединения с базой данных"""
+    async def connect(self):
+        """Открытие пула соединений с базой данных (повторный вызов ничего не делает)"""
+        if not self.pool.closed:
+            return
+        
         try:
-            if 'dsn' in DB_CONFIG:
-                # Используем строку подключения
-                self.conn = psycopg.connect(DB_CONFIG['dsn'])
-            else:
-                # Используем отдельные параметры
-                self.conn = psycopg.connect(**DB_CONFIG)
-            
-            self.conn.autocommit = False
+            await self.pool.open(wait=True)
             print("Подключение к базе данных установлено")
         except Exception as e:
             print(f"Ошибка подключения к базе данных: {e}")
             raise
     
-    def get_cursor(self):
-        """Получение курсора с поддержкой именованных параметров"""
-        return self.conn.cursor(row_factory=dict_row)
+    async def get_schema_version(self):
+        """Текущая версия схемы БД (0, если миграции еще не применялись)"""
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute("SELECT COALESCE(MAX(version), 0) as version FROM schema_version")
+                result = await cursor.fetchone()
+                return result['version']
+        except UndefinedTable:
+            return 0
+    
+    async def ping(self):
+        """Проверка доступности БД (для /healthz)"""
+        try:
+            async with self.pool.connection(timeout=5) as conn:
+                await conn.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+    
+    async def check_schema(self, required_version):
+        """Проверка, что миграции применены (их применяет init_db.py при деплое)"""
+        schema_version = await self.get_schema_version()
+        if schema_version < required_version:
+            raise RuntimeError(
+                f"Схема БД устарела (версия {schema_version}, нужна {required_version}). "
+                "Запустите python init_db.py"
+            )
+    
+    @asynccontextmanager
+    async def get_cursor(self):
+        """Получение курсора из пула (транзакция фиксируется при выходе)"""
+        async with self.pool.connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cursor:
+                yield cursor
+    
+    async def listen(self, channel):
+        """Получение уведомлений NOTIFY из канала.
+        
+        Для LISTEN нужно отдельное соединение вне пула: оно занято все время ожидания.
+        """
+        async with await AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+            await conn.execute(f"LISTEN {channel}")
+            async for notify in conn.notifies():
+                yield notify
     
     # === ПОЛЬЗОВАТЕЛИ ===
-    def add_user(self, telegram_id, full_name, role='user'):
+    async def add_user(self, telegram_id, full_name, role='user'):
         """Добавление нового пользователя"""
-        with self.get_cursor() as cursor:
-            cursor.execute("""
+        async with self.get_cursor() as cursor:
+            await cursor.execute("""
                 INSERT INTO users (telegram_id, full_name, role)
                 VALUES (%s, %s, %s)
                 ON CONFLICT (telegram_id) DO NOTHING
                 RETURNING id
             """, (telegram_id, full_name, role))
-            return cursor.fetchone()
+            return await cursor.fetchone()
     
-    def get_user(self, telegram_id):
+    async def get_user(self, telegram_id):
         """Получение пользователя по Telegram ID"""
-        with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM users WHERE telegram_id = %s", (telegram_id,))
-            return cursor.fetchone()
+        async with self.get_cursor() as cursor:
+            await cursor.execute("SELECT * FROM users WHERE telegram_id = %s", (telegram_id,))
+            return await cursor.fetchone()
     
-    def get_all_users(self):
+    async def get_all_users(self):
         """Получение всех пользователей"""
-        with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM users ORDER BY id")
-            return cursor.fetchall()
+        async with self.get_cursor() as cursor:
+            await cursor.execute("SELECT * FROM users ORDER BY id")
+            return await cursor.fetchall()
     
-    def delete_user(self, telegram_id):
+    async def get_admin_ids(self):
+        """Telegram ID всех администраторов"""
+        async with self.get_cursor() as cursor:
+            await cursor.execute("SELECT telegram_id FROM users WHERE role = 'admin'")
+            results = await cursor.fetchall()
+            return [row['telegram_id'] for row in results]
+    
+    async def delete_user(self, telegram_id):
         """Удаление пользователя"""
-        with self.get_cursor() as cursor:
-            cursor.execute("DELETE FROM users WHERE telegram_id = %s", (telegram_id,))
-            self.conn.commit()
+        async with self.get_cursor() as cursor:
+            await cursor.execute("DELETE FROM users WHERE telegram_id = %s", (telegram_id,))
             return cursor.rowcount > 0
     
     # === КОМПЛЕКСЫ И ОИВ ===
-    def get_complexes(self):
+    async def get_complexes(self):
         """Получение списка всех комплексов"""
-        with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM complexes ORDER BY id")
-            return cursor.fetchall()
+        async with self.get_cursor() as cursor:
+            await cursor.execute("SELECT * FROM complexes ORDER BY id")
+            return await cursor.fetchall()
     
-    def get_oivs_by_complex(self, complex_id):
+    async def get_oivs_by_complex(self, complex_id):
         """Получение ОИВ по ID комплекса"""
-        with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM oivs WHERE complex_id = %s ORDER BY name", (complex_id,))
-            return cursor.fetchall()
+        async with self.get_cursor() as cursor:
+            await cursor.execute("SELECT * FROM oivs WHERE complex_id = %s ORDER BY name", (complex_id,))
+            return await cursor.fetchall()
     
-    def get_oiv(self, oiv_id):
+    async def get_oiv(self, oiv_id):
         """Получение ОИВ по ID"""
-        with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM oivs WHERE id = %s", (oiv_id,))
-            return cursor.fetchone()
+        async with self.get_cursor() as cursor:
+            await cursor.execute("SELECT * FROM oivs WHERE id = %s", (oiv_id,))
+            return await cursor.fetchone()
     
-    def get_all_oivs(self):
+    async def get_all_oivs(self):
         """Получение всех ОИВ с комплексами"""
-        with self.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT o.*, c.name as complex_name 
-                FROM oivs o 
-                JOIN complexes c ON o.complex_id = c.id 
+        async with self.get_cursor() as cursor:
+            await cursor.execute("""
+                SELECT o.*, c.name as complex_name
+                FROM oivs o
+                JOIN complexes c ON o.complex_id = c.id
                 ORDER BY c.id, o.name
             """)
-            return cursor.fetchall()
+            return await cursor.fetchall()
     
     # === ВСТРЕЧИ ===
-    def add_meeting(self, user_id, user_name, oiv_id, meeting_date, status, duration_minutes, summary):
+    async def add_meeting(self, user_id, user_name, oiv_id, meeting_date, status, duration_minutes, summary):
         """Добавление новой встречи"""
-        with self.get_cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO meetings 
+        async with self.get_cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO meetings
                 (user_id, user_name, oiv_id, meeting_date, status, duration_minutes, summary)
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
                 RETURNING id
             """, (user_id, user_name, oiv_id, meeting_date, status, duration_minutes, summary))
-            self.conn.commit()
-            result = cursor.fetchone()
+            result = await cursor.fetchone()
             return result['id'] if result else None
     
-    def get_meeting(self, meeting_id):
+    async def copy_meetings(self, rows):
+        """Массовая загрузка встреч через COPY в одной транзакции.
+        
+        rows - кортежи (user_id, user_name, oiv_id, meeting_date, status, duration_minutes, summary)
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                async with cursor.copy("""
+                    COPY meetings (user_id, user_name, oiv_id, meeting_date, status, duration_minutes, summary)
+                    FROM STDIN
+                """) as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+        
+        return len(rows)
+    
+    async def get_meeting(self, meeting_id):
         """Получение встречи по ID с полной информацией"""
-        with self.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT m.*, o.name as oiv_name, c.name as complex_name
+        async with self.get_cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT {MEETING_COLUMNS}, o.name as oiv_name, c.name as complex_name
                 FROM meetings m
                 JOIN oivs o ON m.oiv_id = o.id
                 JOIN complexes c ON o.complex_id = c.id
                 WHERE m.id = %s
             """, (meeting_id,))
-            return cursor.fetchone()
+            return await cursor.fetchone()
     
-    def get_user_meetings(self, user_id):
+    async def get_user_meetings(self, user_id):
         """Получение всех встреч пользователя"""
-        with self.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT m.*, o.name as oiv_name, c.name as complex_name
+        async with self.get_cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT {MEETING_COLUMNS}, o.name as oiv_name, c.name as complex_name
                 FROM meetings m
                 JOIN oivs o ON m.oiv_id = o.id
                 JOIN complexes c ON o.complex_id = c.id
                 WHERE m.user_id = %s
                 ORDER BY m.meeting_date DESC, m.created_at DESC
             """, (user_id,))
-            return cursor.fetchall()
+            return await cursor.fetchall()
     
-    def get_all_meetings(self, filters=None):
-        """Получение всех встреч с фильтрами"""
-        query = """
-            SELECT m.*, o.name as oiv_name, c.name as complex_name
-            FROM meetings m
-            JOIN oivs o ON m.oiv_id = o.id
-            JOIN complexes c ON o.complex_id = c.id
-            WHERE 1=1
-        """
+    def _meeting_filters(self, filters):
+        """Построение условий WHERE и параметров для фильтров встреч"""
+        conditions = ""
         params = []
         
         if filters:
+            # Год и месяц превращаем в диапазон дат, чтобы работал индекс по meeting_date
             if filters.get('year'):
-                query += " AND EXTRACT(YEAR FROM m.meeting_date) = %s"
-                params.append(filters['year'])
-            if filters.get('month'):
-                query += " AND EXTRACT(MONTH FROM m.meeting_date) = %s"
+                conditions += " AND m.meeting_date >= %s AND m.meeting_date < %s"
+                params.extend(month_range(filters['year'], filters.get('month')))
+            elif filters.get('month'):
+                conditions += " AND EXTRACT(MONTH FROM m.meeting_date) = %s"
                 params.append(filters['month'])
             if filters.get('complex_id'):
-                query += " AND c.id = %s"
+                conditions += " AND c.id = %s"
                 params.append(filters['complex_id'])
             if filters.get('oiv_id'):
-                query += " AND o.id = %s"
+                conditions += " AND o.id = %s"
                 params.append(filters['oiv_id'])
             if filters.get('status'):
-                query += " AND m.status = %s"
+                conditions += " AND m.status = %s"
                 params.append(filters['status'])
         
-        query += " ORDER BY m.meeting_date DESC, m.created_at DESC"
+        return conditions, params
+    
+    async def get_all_meetings(self, filters=None):
+        """Получение всех встреч с фильтрами"""
+        conditions, params = self._meeting_filters(filters)
+        query = f"""
+            SELECT {MEETING_COLUMNS}, o.name as oiv_name, c.name as complex_name
+            FROM meetings m
+            JOIN oivs o ON m.oiv_id = o.id
+            JOIN complexes c ON o.complex_id = c.id
+            WHERE 1=1 {conditions}
+            ORDER BY m.meeting_date DESC, m.created_at DESC
+        """
+        
+        async with self.get_cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+    
+    async def iter_meetings(self, filters=None, batch_size=1000):
+        """Потоковое чтение встреч с фильтрами через именованный (серверный) курсор.
+        
+        Строки приходят пачками по batch_size, поэтому память не зависит от объема выборки.
+        """
+        conditions, params = self._meeting_filters(filters)
+        query = f"""
+            SELECT {MEETING_COLUMNS}, o.name as oiv_name, c.name as complex_name
+            FROM meetings m
+            JOIN oivs o ON m.oiv_id = o.id
+            JOIN complexes c ON o.complex_id = c.id
+            WHERE 1=1 {conditions}
+            ORDER BY m.meeting_date DESC, m.created_at DESC, m.id DESC
+        """
+        
+        # Серверный курсор живет внутри транзакции, соединение занято до конца чтения
+        async with self.pool.connection() as conn:
+            async with conn.cursor(name='meetings_export', row_factory=dict_row) as cursor:
+                cursor.itersize = batch_size
+                await cursor.execute(query, params)
+                async for row in cursor:
+                    yield row
+    
+    async def get_meetings_page(self, filters=None, cursor_key=None, backward=False, limit=10):
+        """Получение страницы встреч по ключу (meeting_date, created_at, id).
+        
+        Встречи упорядочены от новых к старым. cursor_key - ключ последней
+        встречи предыдущей страницы (или первой, если backward=True).
+        """
+        conditions, params = self._meeting_filters(filters)
+        
+        if cursor_key:
+            comparison = ">" if backward else "<"
+            conditions += f" AND (m.meeting_date, m.created_at, m.id) {comparison} (%s, %s, %s)"
+            params.extend(cursor_key)
+        
+        order = "ASC" if backward else "DESC"
+        query = f"""
+            SELECT m.id, m.meeting_date, m.created_at, m.status, o.name as oiv_name
+            FROM meetings m
+            JOIN oivs o ON m.oiv_id = o.id
+            JOIN complexes c ON o.complex_id = c.id
+            WHERE 1=1 {conditions}
+            ORDER BY m.meeting_date {order}, m.created_at {order}, m.id {order}
+            LIMIT %s
+        """
+        # Лишняя строка показывает, есть ли следующая страница
+        params.append(limit + 1)
+        
+        async with self.get_cursor() as cursor:
+            await cursor.execute(query, params)
+            meetings = await cursor.fetchall()
+        
+        has_more = len(meetings) > limit
+        meetings = meetings[:limit]
+        
+        if backward:
+            meetings.reverse()
+            return {'meetings': meetings, 'has_prev': has_more, 'has_next': True}
+        
+        return {'meetings': meetings, 'has_prev': cursor_key is not None, 'has_next': has_more}
+    
+    async def count_meetings(self, filters=None):
+        """Подсчет количества встреч с фильтрами"""
+        active = {key for key, value in (filters or {}).items() if value}
+        
+        if active and active <= {'year', 'month'} and 'year' in active:
+            # Фильтр только по году/месяцу считаем по сводной таблице
+            query = "SELECT COALESCE(SUM(count), 0)::int as count FROM meeting_month_counts WHERE year = %s"
+            params = [filters['year']]
+            if filters.get('month'):
+                query += " AND month = %s"
+                params.append(filters['month'])
+            
+            async with self.get_cursor() as cursor:
+                await cursor.execute(query, params)
+                result = await cursor.fetchone()
+                return result['count']
+        
+        conditions, params = self._meeting_filters(filters)
+        query = f"""
+            SELECT COUNT(*) as count
+            FROM meetings m
+            JOIN oivs o ON m.oiv_id = o.id
+            JOIN complexes c ON o.complex_id = c.id
+            WHERE 1=1 {conditions}
+        """
+        
+        async with self.get_cursor() as cursor:
+            await cursor.execute(query, params)
+            result = await cursor.fetchone()
+            return result['count']
+    
+    async def search_meetings(self, text, limit=10, offset=0):
+        """Полнотекстовый поиск встреч по содержанию с ранжированием.
+        
+        Возвращает страницу результатов с фрагментами, где совпадения
+        выделены маркерами HIGHLIGHT_START/HIGHLIGHT_STOP, и общее число найденных.
+        """
+        query = f"""
+            WITH q AS (
+                SELECT websearch_to_tsquery('russian', %s) as query
+            ),
+            hits AS (
+                SELECT m.id, ts_rank_cd(m.summary_tsv, q.query) as rank,
+                       COUNT(*) OVER () as total
+                FROM meetings m, q
+                WHERE m.summary_tsv @@ q.query
+                ORDER BY rank DESC, m.meeting_date DESC, m.id DESC
+                LIMIT %s OFFSET %s
+            )
+            SELECT m.id, m.meeting_date, m.status, o.name as oiv_name, hits.rank, hits.total,
+                   ts_headline('russian', m.summary, q.query,
+                               'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=20, MinWords=8') as headline
+            FROM hits
+            JOIN meetings m ON m.id = hits.id
+            JOIN oivs o ON m.oiv_id = o.id
+            CROSS JOIN q
+            ORDER BY hits.rank DESC, m.meeting_date DESC, m.id DESC
+        """
+        
+        async with self.get_cursor() as cursor:
+            await cursor.execute(query, (text, limit, offset))
+            meetings = await cursor.fetchall()
         
-        with self.get_cursor() as cursor:
-            cursor.execute(query, params)
-            return cursor.fetchall()
+        total = meetings[0]['total'] if meetings else 0
+        return {
+            'meetings': meetings,
+            'total': total,
+            'has_prev': offset > 0,
+            'has_next': offset + len(meetings) < total
+        }
     
-    def get_meeting_years(self):
-        """Получение списка годов, в которые были встречи"""
-        with self.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT DISTINCT EXTRACT(YEAR FROM meeting_date) as year
-                FROM meetings 
+    async def get_meeting_years(self):
+        """Получение списка годов, в которые были встречи (из сводной таблицы)"""
+        async with self.get_cursor() as cursor:
+            await cursor.execute("""
+                SELECT DISTINCT year
+                FROM meeting_month_counts
                 ORDER BY year DESC
             """)
-            results = cursor.fetchall()
-            return [int(row['year']) for row in results if row['year']]
+            results = await cursor.fetchall()
+            return [row['year'] for row in results]
     
-    def get_meeting_months(self, year):
+    async def get_meeting_months(self, year):
         """Получение списка месяцев с встречами для указанного года"""
-        with self.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT DISTINCT EXTRACT(MONTH FROM meeting_date) as month
-                FROM meetings 
-                WHERE EXTRACT(YEAR FROM meeting_date) = %s
+        month_counts = await self.get_month_counts(year)
+        return [row['month'] for row in month_counts]
+    
+    async def get_month_counts(self, year):
+        """Количество и суммарная длительность встреч по месяцам года"""
+        async with self.get_cursor() as cursor:
+            await cursor.execute("""
+                SELECT month, SUM(count)::int as count, SUM(total_duration)::bigint as total_duration
+                FROM meeting_month_counts
+                WHERE year = %s
+                GROUP BY month
                 ORDER BY month DESC
             """, (year,))
-            results = cursor.fetchall()
-            return [int(row['month']) for row in results if row['month']]
+            return await cursor.fetchall()
+    
+    async def get_meeting_day_counts(self, year, month, oiv_id=None):
+        """Количество встреч по дням месяца: {день: количество} (для отметок в календаре)"""
+        start, end = month_range(year, month)
+        conditions = ""
+        params = [start, end - timedelta(days=1)]
+        if oiv_id:
+            conditions = " AND oiv_id = %s"
+            params.append(oiv_id)
+        
+        async with self.get_cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT EXTRACT(DAY FROM meeting_date)::int as day, COUNT(*)::int as count
+                FROM meetings
+                WHERE meeting_date BETWEEN %s AND %s {conditions}
+                GROUP BY 1
+            """, params)
+            results = await cursor.fetchall()
+            return {row['day']: row['count'] for row in results}
+    
+    async def get_planned_meetings_due(self, until_date, after_key=None, limit=500):
+        """Запланированные встречи с датой не позже until_date (просроченные и ближайшие).
+        
+        Пачка по ключу (meeting_date, id): after_key - ключ последней встречи предыдущей пачки.
+        """
+        conditions = ""
+        params = [MEETING_STATUS_PLANNED, until_date]
+        if after_key:
+            conditions = " AND (m.meeting_date, m.id) > (%s, %s)"
+            params.extend(after_key)
+        params.append(limit)
+        
+        async with self.get_cursor() as cursor:
+            await cursor.execute(f"""
+                SELECT m.id, m.user_id, m.meeting_date, m.summary, o.name as oiv_name
+                FROM meetings m
+                JOIN oivs o ON m.oiv_id = o.id
+                WHERE m.status = %s AND m.meeting_date <= %s {conditions}
+                ORDER BY m.meeting_date, m.id
+                LIMIT %s
+            """, params)
+            return await cursor.fetchall()
+    
+    async def get_meeting_changes(self, since, until, limit=30):
+        """Изменения встреч за полуинтервал (since, until] для сводки администраторам.
+        
+        Новые встречи берутся по created_at, смены статуса - по status_changed_at (оба с индексом).
+        У новой встречи status_changed_at совпадает с created_at: это не смена статуса.
+        """
+        async with self.get_cursor() as cursor:
+            await cursor.execute("""
+                SELECT
+                    COUNT(*) FILTER (WHERE created_at > %(since)s AND created_at <= %(until)s)::int as added,
+                    status,
+                    COUNT(*) FILTER (
+                        WHERE status_changed_at > %(since)s AND status_changed_at <= %(until)s
+                          AND status_changed_at > created_at
+                    )::int as changed
+                FROM meetings
+                WHERE (created_at > %(since)s AND created_at <= %(until)s)
+                   OR (status_changed_at > %(since)s AND status_changed_at <= %(until)s
+                       AND status_changed_at > created_at)
+                GROUP BY status
+            """, {'since': since, 'until': until})
+            rows = await cursor.fetchall()
+            
+            await cursor.execute(f"""
+                SELECT {MEETING_COLUMNS}, o.name as oiv_name
+                FROM meetings m
+                JOIN oivs o ON m.oiv_id = o.id
+                WHERE m.created_at > %s AND m.created_at <= %s
+                ORDER BY m.created_at
+                LIMIT %s
+            """, (since, until, limit))
+            added_meetings = await cursor.fetchall()
+        
+        return {
+            'added': sum(row['added'] for row in rows),
+            'by_status': {row['status']: row['changed'] for row in rows if row['changed']},
+            'added_meetings': added_meetings
+        }
     
-    def update_meeting(self, meeting_id, **fields):
+    async def get_digest_watermark(self, name):
+        """Момент, до которого изменения уже вошли в сводку (или None)"""
+        async with self.get_cursor() as cursor:
+            await cursor.execute("SELECT watermark FROM digest_state WHERE name = %s", (name,))
+            result = await cursor.fetchone()
+            return result['watermark'] if result else None
+    
+    async def set_digest_watermark(self, name, watermark):
+        """Сохранение водяного знака сводки"""
+        async with self.get_cursor() as cursor:
+            await cursor.execute("""
+                INSERT INTO digest_state (name, watermark) VALUES (%s, %s)
+                ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark
+            """, (name, watermark))
+    
+    async def update_meeting(self, meeting_id, **fields):
         """Обновление данных встречи"""
         if not fields:
             return False
@@ -194,27 +540,25 @@ class Database:
         values = list(fields.values())
         values.append(meeting_id)
         
-        with self.get_cursor() as cursor:
-            cursor.execute(f"""
-                UPDATE meetings 
+        async with self.get_cursor() as cursor:
+            await cursor.execute(f"""
+                UPDATE meetings
                 SET {set_clause}
                 WHERE id = %s
             """, values)
-            self.conn.commit()
             return cursor.rowcount > 0
     
-    def delete_meeting(self, meeting_id):
+    async def delete_meeting(self, meeting_id):
         """Удаление встречи"""
-        with self.get_cursor() as cursor:
-            cursor.execute("DELETE FROM meetings WHERE id = %s", (meeting_id,))
-            self.conn.commit()
+        async with self.get_cursor() as cursor:
+            await cursor.execute("DELETE FROM meetings WHERE id = %s", (meeting_id,))
             return cursor.rowcount > 0
     
     # === СТАТИСТИКА ===
-    def get_statistics(self, start_date=None, end_date=None):
+    async def get_statistics(self, start_date=None, end_date=None):
         """Получение статистики по встречам"""
         query = """
-            SELECT 
+            SELECT
                 c.name as complex_name,
                 o.name as oiv_name,
                 m.status,
@@ -238,15 +582,196 @@ class Database:
             ORDER BY c.name, o.name, m.status
         """
         
-        with self.get_cursor() as cursor:
-            cursor.execute(query, params)
-            return cursor.fetchall()
+        async with self.get_cursor() as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+    
+    async def get_statistics_summary(self, start_date=None, end_date=None, top_n=3):
+        """Сводная статистика за один запрос: итоги по комплексам и статусам,
+        топ ОИВ каждого комплекса, общий итог и последняя встреча"""
+        conditions = ""
+        params = []
+        
+        if start_date:
+            conditions += " AND m.meeting_date >= %s"
+            params.append(start_date)
+        if end_date:
+            conditions += " AND m.meeting_date <= %s"
+            params.append(end_date)
+        
+        # level = GROUPING(complex_name, oiv_name, status):
+        # 1 - комплекс+ОИВ, 2 - комплекс+статус, 3 - комплекс, 7 - общий итог, -1 - последняя встреча
+        query = f"""
+            WITH filtered AS (
+                SELECT m.id, m.meeting_date, m.created_at, m.status,
+                       o.name as oiv_name, c.name as complex_name
+                FROM meetings m
+                JOIN oivs o ON m.oiv_id = o.id
+                JOIN complexes c ON o.complex_id = c.id
+                WHERE 1=1 {conditions}
+            ),
+            grouped AS (
+                SELECT complex_name, oiv_name, status, COUNT(*) as count,
+                       GROUPING(complex_name, oiv_name, status) as level
+                FROM filtered
+                GROUP BY GROUPING SETS (
+                    (complex_name), (complex_name, status), (complex_name, oiv_name), ()
+                )
+            ),
+            ranked AS (
+                SELECT grouped.*,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY level, complex_name
+                           ORDER BY count DESC, oiv_name, status
+                       ) as rank
+                FROM grouped
+            ),
+            latest AS (
+                SELECT -1 as level, complex_name, oiv_name, status,
+                       NULL::bigint as count, 0::bigint as rank, meeting_date
+                FROM filtered
+                ORDER BY meeting_date DESC, created_at DESC, id DESC
+                LIMIT 1
+            )
+            SELECT level, complex_name, oiv_name, status, count, rank, NULL::date as meeting_date
+            FROM ranked
+            WHERE level <> 1 OR rank <= %s
+            UNION ALL
+            SELECT * FROM latest
+            ORDER BY complex_name NULLS LAST, level DESC, status, rank
+        """
+        params.append(top_n)
+        
+        async with self.get_cursor() as cursor:
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+        
+        summary = {'total': 0, 'complexes': [], 'latest': None}
+        complexes = {}
+        
+        for row in rows:
+            level = row['level']
+            
+            if level == -1:
+                summary['latest'] = {
+                    'meeting_date': row['meeting_date'],
+                    'oiv_name': row['oiv_name'],
+                    'complex_name': row['complex_name']
+                }
+                continue
+            
+            if level == 7:
+                summary['total'] = row['count']
+                continue
+            
+            complex_stats = complexes.get(row['complex_name'])
+            if complex_stats is None:
+                complex_stats = {'name': row['complex_name'], 'total': 0, 'by_status': {}, 'top_oivs': []}
+                complexes[row['complex_name']] = complex_stats
+                summary['complexes'].append(complex_stats)
+            
+            if level == 3:
+                complex_stats['total'] = row['count']
+            elif level == 2:
+                complex_stats['by_status'][row['status']] = row['count']
+            elif level == 1:
+                complex_stats['top_oivs'].append({'name': row['oiv_name'], 'count': row['count']})
+        
+        return summary
+    
+    async def get_period_statistics(self, start_date=None, end_date=None, top_n=3):
+        """Статистика за период; закрытые периоды берутся из кэша в БД"""
+        # Период закрыт, если он полностью в прошлом (и ограничен с обеих сторон);
+        # "сегодня" - по часовому поясу расписания, а не сервера
+        today = datetime.now(TIMEZONE).date()
+        cacheable = start_date is not None and end_date is not None and end_date < today
+        
+        if cacheable:
+            async with self.get_cursor() as cursor:
+                await cursor.execute("""
+                    SELECT payload FROM statistics_cache
+                    WHERE period_start = %s AND period_end = %s AND top_n = %s
+                """, (start_date, end_date, top_n))
+                cached = await cursor.fetchone()
+            
+            if cached:
+                summary = cached['payload']
+                if summary['latest']:
+                    summary['latest']['meeting_date'] = date.fromisoformat(summary['latest']['meeting_date'])
+                return summary
+        
+        summary = await self.get_statistics_summary(start_date, end_date, top_n)
+        
+        if cacheable:
+            payload = dict(summary)
+            if summary['latest']:
+                payload['latest'] = dict(summary['latest'], meeting_date=summary['latest']['meeting_date'].isoformat())
+            
+            async with self.get_cursor() as cursor:
+                await cursor.execute("""
+                    INSERT INTO statistics_cache (period_start, period_end, top_n, payload)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (period_start, period_end, top_n) DO UPDATE
+                    SET payload = EXCLUDED.payload, computed_at = CURRENT_TIMESTAMP
+                """, (start_date, end_date, top_n, Jsonb(payload)))
+        
+        return summary
+    
+    # === СОСТОЯНИЕ БОТА (persistence) ===
+    async def get_bot_user_data(self, user_id):
+        """Сохраненные данные пользователя бота (JSON-текст или None)"""
+        async with self.get_cursor() as cursor:
+            await cursor.execute(
+                "SELECT data::text as data FROM bot_user_data WHERE user_id = %s", (user_id,)
+            )
+            result = await cursor.fetchone()
+            return result['data'] if result else None
+    
+    async def save_bot_user_data(self, rows, deleted_ids=()):
+        """Пакетное сохранение данных пользователей: rows - пары (user_id, JSON-текст)"""
+        async with self.get_cursor() as cursor:
+            if rows:
+                await cursor.executemany("""
+                    INSERT INTO bot_user_data (user_id, data, updated_at)
+                    VALUES (%s, %s::jsonb, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id) DO UPDATE
+                    SET data = EXCLUDED.data, updated_at = EXCLUDED.updated_at
+                """, rows)
+            if deleted_ids:
+                await cursor.execute(
+                    "DELETE FROM bot_user_data WHERE user_id = ANY(%s)", (list(deleted_ids),)
+                )
+    
+    async def get_bot_conversations(self, name):
+        """Сохраненные состояния диалогов ConversationHandler: строки (key, state)"""
+        async with self.get_cursor() as cursor:
+            await cursor.execute(
+                "SELECT key, state::text as state FROM bot_conversations WHERE name = %s", (name,)
+            )
+            return await cursor.fetchall()
+    
+    async def save_bot_conversations(self, rows, deleted_keys=()):
+        """Пакетное сохранение состояний диалогов.
+        
+        rows - тройки (name, key, JSON-текст состояния), deleted_keys - пары (name, key)
+        """
+        async with self.get_cursor() as cursor:
+            if rows:
+                await cursor.executemany("""
+                    INSERT INTO bot_conversations (name, key, state, updated_at)
+                    VALUES (%s, %s, %s::jsonb, CURRENT_TIMESTAMP)
+                    ON CONFLICT (name, key) DO UPDATE
+                    SET state = EXCLUDED.state, updated_at = EXCLUDED.updated_at
+                """, rows)
+            if deleted_keys:
+                await cursor.executemany(
+                    "DELETE FROM bot_conversations WHERE name = %s AND key = %s", list(deleted_keys)
+                )
     
-    def close(self):
-        """Закрытие соединения с базой данных"""
-        if self.conn:
-            self.conn.close()
-            print("Соединение с базой данных закрыто")
+    async def close(self):
+        """Закрытие пула соединений с базой данных"""
+        await self.pool.close()
+        print("Соединение с базой данных закрыто")
 
 # Глобальный экземпляр базы данных
 db = Database()
@@ -0,0 +1,81 @@
+"""
+Сводка изменений встреч для администраторов по расписанию.
+Считается только по изменениям после предыдущей сводки (водяной знак в digest_state).
+"""
+
+import html
+import logging
+from datetime import datetime, timedelta, timezone
+from config import TIMEZONE
+from database import db
+from keyboards import MEETING_STATUSES
+from notifications import get_admin_chat_ids, notifier, split_message
+
+logger = logging.getLogger(__name__)
+
+DIGEST_NAME = 'admin_digest'
+
+# Встречи, сохраненные в последнюю минуту, могут быть еще не видны (транзакция не зафиксирована),
+# поэтому водяной знак отстает от текущего времени
+WATERMARK_LAG = timedelta(minutes=1)
+
+# Первая сводка охватывает не больше этого периода
+FIRST_DIGEST_PERIOD = timedelta(days=1)
+
+MAX_LISTED_MEETINGS = 30
+
+# Подписи изменений статуса в сводке
+STATUS_LABELS = {
+    "Состоялась": "Состоялось",
+    "Отменена": "Отменено",
+    "Перенесена": "Перенесено",
+    "Запланирована": "Запланировано"
+}
+
+def format_digest(changes, since, until):
+    """Текст сводки в HTML"""
+    since_str = since.astimezone(TIMEZONE).strftime('%d.%m.%Y %H:%M')
+    until_str = until.astimezone(TIMEZONE).strftime('%d.%m.%Y %H:%M')
+    
+    lines = [
+        "🗞 <b>Сводка по встречам</b>",
+        f"{since_str} — {until_str}",
+        "",
+        f"➕ Добавлено: {changes['added']}"
+    ]
+    for status, count in sorted(changes['by_status'].items(), key=lambda item: -item[1]):
+        icon = MEETING_STATUSES.get(status, '📊')
+        lines.append(f"{icon} {STATUS_LABELS.get(status, status)}: {count}")
+    
+    if changes['added_meetings']:
+        lines.append("")
+        lines.append("<b>Новые встречи:</b>")
+        for meeting in changes['added_meetings']:
+            lines.append(
+                f"• {meeting['meeting_date'].strftime('%d.%m.%Y')} "
+                f"{html.escape(meeting['oiv_name'])} — {html.escape(meeting['status'])} "
+                f"({html.escape(meeting['user_name'] or '')})"
+            )
+        if changes['added'] > len(changes['added_meetings']):
+            lines.append(f"... и еще {changes['added'] - len(changes['added_meetings'])}")
+    
+    return "\n".join(lines)
+
+async def send_admin_digest(context):
+    """Задача JobQueue: сводка изменений с момента предыдущей сводки"""
+    until = datetime.now(timezone.utc) - WATERMARK_LAG
+    since = await db.get_digest_watermark(DIGEST_NAME) or until - FIRST_DIGEST_PERIOD
+    if since >= until:
+        return
+    
+    changes = await db.get_meeting_changes(since, until, MAX_LISTED_MEETINGS)
+    
+    if changes['added'] or changes['by_status']:
+        text = format_digest(changes, since, until)
+        for admin_id in await get_admin_chat_ids():
+            for part in split_message(text):
+                await notifier.send(admin_id, part)
+    
+    # Сдвигаем водяной знак, даже если изменений не было
+    await db.set_digest_watermark(DIGEST_NAME, until)
+    logger.info(f"Сводка для админов: добавлено {changes['added']}, смен статуса {sum(changes['by_status'].values())}")
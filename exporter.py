@@ -0,0 +1,64 @@
+"""
+Выгрузка встреч в CSV, сжатый gzip.
+Строки читаются серверным курсором и сразу пишутся во временный файл.
+"""
+
+import csv
+import gzip
+import os
+import tempfile
+from database import db
+
+# Заголовки совпадают с импортом, поэтому распакованную выгрузку можно загрузить обратно
+EXPORT_COLUMNS = ['Дата', 'Комплекс', 'ОИВ', 'Статус', 'Длительность', 'Содержание', 'Автор ID', 'Автор']
+
+# Ячейки, начинающиеся с этих символов, Excel считает формулами
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def escape_formula(value):
+    """Защита от формул в тексте: апостроф перед опасным первым символом (Excel его не показывает)"""
+    if value and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def export_filename(filters):
+    """Имя файла выгрузки по фильтрам"""
+    parts = ['meetings']
+    if filters.get('year'):
+        parts.append(str(filters['year']))
+    if filters.get('month'):
+        parts.append(f"{filters['month']:02d}")
+    return "_".join(parts) + ".csv.gz"
+
+async def export_meetings(filters=None):
+    """Выгрузка встреч во временный файл .csv.gz.
+    
+    Возвращает (путь к файлу, количество строк). Файл удаляет вызывающий код.
+    """
+    fd, path = tempfile.mkstemp(suffix='.csv.gz', prefix='meetings_')
+    os.close(fd)
+    
+    count = 0
+    try:
+        # utf-8-sig и ";" - чтобы файл сразу открывался в Excel с русской локалью
+        with gzip.open(path, 'wt', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(EXPORT_COLUMNS)
+            
+            async for meeting in db.iter_meetings(filters):
+                writer.writerow([
+                    meeting['meeting_date'].strftime('%d.%m.%Y'),
+                    escape_formula(meeting['complex_name']),
+                    escape_formula(meeting['oiv_name']),
+                    meeting['status'],
+                    meeting['duration_minutes'] if meeting['duration_minutes'] is not None else '',
+                    escape_formula(meeting['summary']),
+                    meeting['user_id'],
+                    escape_formula(meeting['user_name'] or '')
+                ])
+                count += 1
+    except BaseException:
+        os.remove(path)
+        raise
+    
+    return path, count
@@ -0,0 +1,116 @@
+"""
+Поддельный Telegram Bot API для нагрузочного теста.
+Отвечает на запросы бота как настоящий сервер и передает отправленные
+сообщения (sendMessage, editMessageText) обработчику вместо пользователей.
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter
+from urllib.parse import parse_qsl
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+BOT_USER = {
+    'id': 1,
+    'is_bot': True,
+    'first_name': "Нагрузочный тест",
+    'username': 'load_test_bot',
+    'can_join_groups': False,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False
+}
+
+# Методы, отправляющие сообщения пользователю (их ответ - объект Message)
+MESSAGE_METHODS = {'sendMessage', 'editMessageText', 'editMessageReplyMarkup'}
+
+def decode_params(body):
+    """Параметры запроса бота (форма без файлов): вложенные объекты PTB передает строками JSON"""
+    params = {}
+    for key, value in parse_qsl(body.decode()):
+        if key == 'text':
+            params[key] = value
+            continue
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+class FakeBotApi:
+    def __init__(self, on_message=None):
+        # on_message(method, params) вызывается для каждого сообщения бота
+        self.on_message = on_message
+        self.calls = Counter()
+        self.next_message_id = 1
+        self.server = None
+        self.task = None
+    
+    def make_message(self, params, message_id):
+        """Объект Message, который вернул бы Telegram"""
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': params['chat_id'], 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', '')
+        }
+        # В Message попадает только inline-клавиатура
+        reply_markup = params.get('reply_markup')
+        if isinstance(reply_markup, dict) and 'inline_keyboard' in reply_markup:
+            message['reply_markup'] = reply_markup
+        return message
+    
+    async def handle(self, request: Request):
+        """Ответ на любой метод Bot API"""
+        method = request.path_params['method']
+        params = decode_params(await request.body())
+        self.calls[method] += 1
+        
+        if method == 'getMe':
+            result = BOT_USER
+        elif method == 'sendMessage':
+            result = self.make_message(params, self.next_message_id)
+            self.next_message_id += 1
+        elif method in MESSAGE_METHODS:
+            result = self.make_message(params, params.get('message_id', 0))
+        else:
+            # answerCallbackQuery, deleteWebhook, setMyCommands и прочие
+            result = True
+        
+        if method in MESSAGE_METHODS and self.on_message:
+            self.on_message(method, result)
+        
+        return JSONResponse({'ok': True, 'result': result})
+    
+    def create_app(self):
+        return Starlette(routes=[
+            Route('/bot{token}/{method}', self.handle, methods=['GET', 'POST']),
+        ])
+    
+    async def start(self, host='127.0.0.1', port=8081):
+        """Запуск сервера в текущем цикле событий"""
+        self.server = uvicorn.Server(uvicorn.Config(
+            app=self.create_app(),
+            host=host,
+            port=port,
+            use_colors=False,
+            log_level='warning'
+        ))
+        self.task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            if self.task.done():
+                # Порт занят или другая ошибка запуска
+                await self.task
+                raise RuntimeError(f"Не удалось запустить поддельный Bot API на порту {port}")
+            await asyncio.sleep(0.05)
+    
+    async def stop(self):
+        if self.server:
+            self.server.should_exit = True
+            await self.task
+            self.server = None
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Скрипт для массового импорта встреч из CSV/XLSX.
+Пример: python import_meetings.py meetings.xlsx --user-id 123456789
+"""
+
+import argparse
+import asyncio
+import os
+from config import ADMIN_IDS
+from database import db
+from importer import ImportFormatError, format_import_errors, import_meetings
+
+async def run_import(args):
+    """Импорт файла и вывод отчета"""
+    with open(args.path, 'rb') as f:
+        content = f.read()
+    
+    await db.connect()
+    try:
+        imported, errors = await import_meetings(
+            content,
+            os.path.basename(args.path),
+            default_user_id=args.user_id,
+            default_user_name=args.user_name,
+            dry_run=args.dry_run
+        )
+    finally:
+        await db.close()
+    
+    if errors:
+        print(f"❌ Найдено ошибок: {len(errors)}. Ничего не загружено.")
+        print(format_import_errors(errors))
+        return 1
+    
+    if args.dry_run:
+        print("✅ Проверка пройдена, ошибок нет.")
+    else:
+        print(f"✅ Импортировано встреч: {imported}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт встреч из CSV/XLSX")
+    parser.add_argument('path', help="Файл .csv или .xlsx")
+    parser.add_argument(
+        '--user-id', type=int, default=ADMIN_IDS[0] if ADMIN_IDS else None,
+        help="Telegram ID автора для строк без столбца «Автор ID» (по умолчанию первый из ADMIN_IDS)"
+    )
+    parser.add_argument('--user-name', default="Импорт", help="Имя автора для строк без столбца «Автор»")
+    parser.add_argument('--dry-run', action='store_true', help="Только проверить файл, ничего не загружая")
+    args = parser.parse_args()
+    
+    if args.user_id is None:
+        parser.error("Укажите --user-id или задайте ADMIN_IDS")
+    
+    try:
+        return asyncio.run(run_import(args))
+    except ImportFormatError as e:
+        print(f"❌ {e}")
+        return 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
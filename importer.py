@@ -0,0 +1,209 @@
+"""
+Массовый импорт встреч из CSV/XLSX.
+Строки проверяются по справочникам, затем загружаются одной транзакцией через COPY.
+"""
+
+import asyncio
+import csv
+import io
+from datetime import date, datetime
+from database import db
+from exporter import FORMULA_PREFIXES
+from keyboards import MEETING_STATUSES
+from oiv_search import normalize_name
+
+# Допустимые заголовки столбцов -> поле встречи
+COLUMN_ALIASES = {
+    'дата': 'meeting_date',
+    'date': 'meeting_date',
+    'оив': 'oiv',
+    'oiv': 'oiv',
+    'статус': 'status',
+    'status': 'status',
+    'длительность': 'duration_minutes',
+    'duration': 'duration_minutes',
+    'содержание': 'summary',
+    'summary': 'summary',
+    'автор id': 'user_id',
+    'user_id': 'user_id',
+    'автор': 'user_name',
+    'user_name': 'user_name'
+}
+
+REQUIRED_COLUMNS = ['meeting_date', 'oiv', 'status', 'summary']
+
+# Не показываем пользователю больше ошибок, чем влезет в сообщение
+MAX_REPORTED_ERRORS = 20
+
+class ImportFormatError(Exception):
+    """Файл не удалось прочитать как таблицу встреч"""
+
+def read_table(content, filename):
+    """Чтение строк таблицы из CSV или XLSX: список списков значений"""
+    if filename.lower().endswith('.xlsx'):
+        # openpyxl нужен только для импорта, поэтому импортируем лениво
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportFormatError("Для импорта XLSX установите пакет openpyxl")
+        
+        try:
+            workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        except Exception as e:
+            raise ImportFormatError(f"Не удалось открыть XLSX: {e}")
+        
+        rows = [list(row) for row in workbook.active.iter_rows(values_only=True)]
+        workbook.close()
+        return rows
+    
+    if filename.lower().endswith('.csv'):
+        try:
+            text = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            text = content.decode('cp1251')
+        
+        # Excel в русской локали сохраняет CSV с разделителем ";"
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        
+        return list(csv.reader(io.StringIO(text), dialect))
+    
+    raise ImportFormatError("Поддерживаются только файлы .csv и .xlsx")
+
+def normalize_header(cell):
+    """Нормализация заголовка столбца для сопоставления с COLUMN_ALIASES"""
+    return ' '.join(str(cell or '').lower().replace('ё', 'е').split())
+
+def parse_date(value):
+    """Дата из ячейки: объект даты или строка ДД.ММ.ГГГГ / ГГГГ-ММ-ДД"""
+    if value in (None, ''):
+        raise ValueError("не указана дата")
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    
+    for date_format in ('%d.%m.%Y', '%Y-%m-%d', '%d.%m.%y'):
+        try:
+            return datetime.strptime(str(value).strip(), date_format).date()
+        except ValueError:
+            continue
+    
+    raise ValueError(f"неверная дата «{value}»")
+
+def parse_duration(value):
+    """Длительность в минутах: целое положительное число (как при вводе в боте) или None"""
+    if value in (None, ''):
+        return None
+    # Из XLSX числа приходят как int или float
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if isinstance(value, float) and not value.is_integer() or value <= 0:
+            raise ValueError(f"длительность «{value}» должна быть целым положительным числом минут")
+        return int(value)
+    
+    text = str(value).strip()
+    if not (text.isascii() and text.isdigit()) or int(text) <= 0:
+        raise ValueError(f"длительность «{value}» должна быть целым положительным числом минут")
+    return int(text)
+
+def validate_rows(table, oivs, default_user_id, default_user_name):
+    """Проверка строк по справочникам.
+    
+    Возвращает (строки для COPY, ошибки [(номер строки, текст)]).
+    """
+    if not table:
+        raise ImportFormatError("Файл пуст")
+    
+    header = [normalize_header(cell) for cell in table[0]]
+    columns = {COLUMN_ALIASES[name]: index for index, name in enumerate(header) if name in COLUMN_ALIASES}
+    
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFormatError(
+            "Нет обязательных столбцов: " + ", ".join(missing) +
+            ". Ожидаются: Дата, ОИВ, Статус, Длительность, Содержание, Автор ID, Автор"
+        )
+    
+    # Справочник ОИВ разрешаем целиком, одним словарем
+    oiv_ids = {normalize_name(oiv['name']): oiv['id'] for oiv in oivs}
+    
+    rows = []
+    errors = []
+    
+    for row_number, row in enumerate(table[1:], start=2):
+        def cell(name):
+            index = columns.get(name)
+            if index is None or index >= len(row) or row[index] is None:
+                return None
+            value = row[index]
+            if not isinstance(value, str):
+                return value
+            # Выгрузка экранирует формулы апострофом, при загрузке обратно он не нужен
+            if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+                value = value[1:]
+            return value.strip()
+        
+        # Пропускаем пустые строки
+        if all(value is None or str(value).strip() == '' for value in row):
+            continue
+        
+        try:
+            meeting_date = parse_date(cell('meeting_date'))
+            
+            oiv_name = str(cell('oiv') or '')
+            oiv_id = oiv_ids.get(normalize_name(oiv_name))
+            if not oiv_id:
+                raise ValueError(f"неизвестный ОИВ «{oiv_name}»")
+            
+            status = str(cell('status') or '')
+            if status not in MEETING_STATUSES:
+                raise ValueError(f"неизвестный статус «{status}»")
+            
+            duration = parse_duration(cell('duration_minutes'))
+            
+            summary = str(cell('summary') or '')
+            if len(summary) < 5:
+                raise ValueError("слишком короткое содержание")
+            
+            user_id = cell('user_id')
+            try:
+                user_id = int(user_id) if user_id not in (None, '') else default_user_id
+            except ValueError:
+                raise ValueError(f"неверный Автор ID «{user_id}»")
+            
+            user_name = cell('user_name') or default_user_name
+            
+            rows.append((user_id, str(user_name), oiv_id, meeting_date, status, duration, summary))
+        except ValueError as e:
+            errors.append((row_number, str(e)))
+    
+    return rows, errors
+
+def format_import_errors(errors):
+    """Текст отчета об ошибках по строкам"""
+    lines = [f"Строка {row_number}: {message}" for row_number, message in errors[:MAX_REPORTED_ERRORS]]
+    if len(errors) > MAX_REPORTED_ERRORS:
+        lines.append(f"... и еще {len(errors) - MAX_REPORTED_ERRORS} ошибок")
+    return "\n".join(lines)
+
+async def import_meetings(content, filename, default_user_id, default_user_name="Импорт", dry_run=False):
+    """Импорт встреч из файла.
+    
+    Если хотя бы одна строка неверна, ничего не загружается.
+    Возвращает (количество загруженных встреч, ошибки).
+    """
+    oivs = await db.get_all_oivs()
+    
+    # Разбор и проверка десятков тысяч строк не должны блокировать цикл событий
+    table = await asyncio.to_thread(read_table, content, filename)
+    rows, errors = await asyncio.to_thread(
+        validate_rows, table, oivs, default_user_id, default_user_name
+    )
+    
+    if errors or dry_run:
+        return 0, errors
+    
+    imported = await db.copy_meetings(rows)
+    return imported, errors
@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 """
 Скрипт для инициализации базы данных.
-Заполняет справочники complexes и oivs данными.
+Применяет миграции схемы и заполняет справочники complexes и oivs данными.
 """
 
 import psycopg  # Изменено
 from psycopg.rows import dict_row
 from config import DB_CONFIG
+from migrations import apply_migrations
 
 # Данные комплексов и ОИВ (из вашего списка)
 COMPLEXES_OIVS = {
@@ -87,50 +88,15 @@ def init_database():
         
         cursor = conn.cursor(row_factory=dict_row)
         
-        # Создаем таблицы (если их нет)
-        print("Создание таблиц...")
+        # Применяем миграции схемы (создание таблиц, индексы)
+        print("Применение миграций...")
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                telegram_id BIGINT NOT NULL UNIQUE,
-                full_name TEXT,
-                role TEXT NOT NULL DEFAULT 'user',
-                registered_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS complexes (
-                id SERIAL PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS oivs (
-                id SERIAL PRIMARY KEY,
-                complex_id INTEGER NOT NULL REFERENCES complexes(id),
-                name TEXT NOT NULL UNIQUE
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS meetings (
-                id SERIAL PRIMARY KEY,
-                user_id BIGINT NOT NULL,
-                user_name TEXT,
-                oiv_id INTEGER NOT NULL REFERENCES oivs(id),
-                meeting_date DATE NOT NULL,
-                status TEXT NOT NULL,
-                duration_minutes INTEGER,
-                summary TEXT NOT NULL,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        applied = apply_migrations(conn)
         
-        conn.commit()
-        print("Таблицы созданы успешно.")
+        if applied:
+            print(f"Применены миграции: {', '.join(map(str, applied))}.")
+        else:
+            print("Схема базы данных актуальна.")
         
         # Заполняем справочник комплексов
         print("Заполнение справочника комплексов...")
@@ -1,7 +1,23 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from database import db
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from config import TIMEZONE
+from database import db, MEETING_STATUS_PLANNED
+from reference import reference
+
+# Объекты разметки в python-telegram-bot неизменяемы, поэтому
+# статичные клавиатуры строим один раз и отдаем один и тот же объект.
+# Клавиатуры из справочников кэшируются по версии справочников (reference.version).
 
 # === ГЛАВНОЕ МЕНЮ ===
+MAIN_MENU_BUTTONS = [
+    "➕ Добавить встречу",
+    "📋 Просмотреть встречи",
+    "👥 Управление пользователями",
+    "📊 Статистика"
+]
+
+@lru_cache(maxsize=None)
 def get_main_menu(user_role='user'):
     """Главное меню в зависимости от роли пользователя"""
     buttons = [
@@ -18,7 +34,12 @@ def get_main_menu(user_role='user'):
 # === КОМПЛЕКСЫ ===
 def get_complexes_keyboard():
     """Клавиатура для выбора комплекса"""
-    complexes = db.get_complexes()
+    return build_complexes_keyboard(reference.version)
+
+@lru_cache(maxsize=1)
+def build_complexes_keyboard(version):
+    """Построение клавиатуры комплексов для версии справочников"""
+    complexes = reference.get_complexes()
     keyboard = []
     
     # Разбиваем на ряды по 2 кнопки
@@ -36,7 +57,12 @@ def get_complexes_keyboard():
 # === ОИВ ===
 def get_oivs_keyboard(complex_id):
     """Клавиатура для выбора ОИВ в комплексе"""
-    oivs = db.get_oivs_by_complex(complex_id)
+    return build_oivs_keyboard(complex_id, reference.version)
+
+@lru_cache(maxsize=64)
+def build_oivs_keyboard(complex_id, version):
+    """Построение клавиатуры ОИВ комплекса для версии справочников"""
+    oivs = reference.get_oivs_by_complex(complex_id)
     keyboard = []
     
     # Разбиваем на ряды по 2 кнопки
@@ -54,22 +80,62 @@ def get_oivs_keyboard(complex_id):
     
     return InlineKeyboardMarkup(keyboard)
 
+# === НАЙДЕННЫЕ ОИВ ===
+def get_oiv_matches_keyboard(oivs):
+    """Клавиатура с ОИВ, найденными по введенному названию"""
+    keyboard = []
+    
+    # Разбиваем на ряды по 2 кнопки
+    for i in range(0, len(oivs), 2):
+        row = []
+        for oiv in oivs[i:i+2]:
+            row.append(InlineKeyboardButton(
+                oiv['name'],
+                callback_data=f"oiv_{oiv['id']}"
+            ))
+        keyboard.append(row)
+    
+    # Кнопка "Назад к комплексам"
+    keyboard.append([InlineKeyboardButton("⬅️ Назад к комплексам", callback_data="back_to_complexes")])
+    
+    return InlineKeyboardMarkup(keyboard)
+
 # === СТАТУС ВСТРЕЧИ ===
+# Допустимые статусы встречи и их значки
+MEETING_STATUSES = {
+    "Состоялась": "✅",
+    "Запланирована": "⏰",
+    "Отменена": "❌",
+    "Перенесена": "↗️"
+}
+
+@lru_cache(maxsize=None)
 def get_status_keyboard():
     """Клавиатура для выбора статуса встречи"""
+    buttons = [
+        InlineKeyboardButton(f"{icon} {status}", callback_data=f"status_{status}")
+        for status, icon in MEETING_STATUSES.items()
+    ]
+    
+    # Разбиваем на ряды по 2 кнопки
+    keyboard = [buttons[i:i+2] for i in range(0, len(buttons), 2)]
+    return InlineKeyboardMarkup(keyboard)
+
+def get_reminder_status_keyboard(meeting_ids):
+    """Клавиатура напоминания: ряд кнопок итогового статуса для каждой встречи
+    (кнопки подписаны номером встречи в тексте напоминания)"""
     keyboard = [
         [
-            InlineKeyboardButton("✅ Состоялась", callback_data="status_Состоялась"),
-            InlineKeyboardButton("⏰ Запланирована", callback_data="status_Запланирована")
-        ],
-        [
-            InlineKeyboardButton("❌ Отменена", callback_data="status_Отменена"),
-            InlineKeyboardButton("↗️ Перенесена", callback_data="status_Перенесена")
+            InlineKeyboardButton(f"{number}. {icon}", callback_data=f"remind_{meeting_id}_{status}")
+            for status, icon in MEETING_STATUSES.items()
+            if status != MEETING_STATUS_PLANNED
         ]
+        for number, meeting_id in enumerate(meeting_ids, start=1)
     ]
     return InlineKeyboardMarkup(keyboard)
 
 # === ПОДТВЕРЖДЕНИЕ ===
+@lru_cache(maxsize=None)
 def get_confirmation_keyboard():
     """Клавиатура подтверждения"""
     keyboard = [
@@ -81,9 +147,10 @@ def get_confirmation_keyboard():
     return InlineKeyboardMarkup(keyboard)
 
 # === ГОДА ===
-def get_years_keyboard():
+async def get_years_keyboard(years=None):
     """Клавиатура с годами для просмотра встреч"""
-    years = db.get_meeting_years()
+    if years is None:
+        years = await db.get_meeting_years()
     keyboard = []
     
     if not years:
@@ -102,9 +169,9 @@ def get_years_keyboard():
     return InlineKeyboardMarkup(keyboard)
 
 # === МЕСЯЦЫ ===
-def get_months_keyboard(year):
-    """Клавиатура с месяцами для выбранного года"""
-    months = db.get_meeting_months(year)
+async def get_months_keyboard(year):
+    """Клавиатура с месяцами для выбранного года (с количеством встреч)"""
+    month_counts = await db.get_month_counts(year)
     month_names = {
         1: "Январь", 2: "Февраль", 3: "Март", 4: "Апрель",
         5: "Май", 6: "Июнь", 7: "Июль", 8: "Август",
@@ -113,9 +180,10 @@ def get_months_keyboard(year):
     
     keyboard = []
     row = []
-    for month_num in months:
+    for month_count in month_counts:
+        month_num = month_count['month']
         row.append(InlineKeyboardButton(
-            month_names[month_num],
+            f"{month_names[month_num]} ({month_count['count']})",
             callback_data=f"month_{year}_{month_num}"
         ))
         if len(row) == 3:
@@ -131,14 +199,26 @@ def get_months_keyboard(year):
     return InlineKeyboardMarkup(keyboard)
 
 # === ВСТРЕЧИ ЗА МЕСЯЦ ===
-def get_meetings_keyboard(meetings, page=0, meetings_per_page=10):
-    """Клавиатура со списком встреч"""
-    start_idx = page * meetings_per_page
-    end_idx = start_idx + meetings_per_page
-    page_meetings = meetings[start_idx:end_idx]
-    
+CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def encode_page_cursor(meeting):
+    """Упаковка ключа встречи (дата, время создания, ID) в callback_data"""
+    created_us = (meeting['created_at'] - CURSOR_EPOCH) // timedelta(microseconds=1)
+    return f"{meeting['meeting_date'].strftime('%Y%m%d')}_{created_us}_{meeting['id']}"
+
+def decode_page_cursor(cursor):
+    """Распаковка ключа встречи из callback_data"""
+    meeting_date, created_us, meeting_id = cursor.split('_')
+    return (
+        datetime.strptime(meeting_date, '%Y%m%d').date(),
+        CURSOR_EPOCH + timedelta(microseconds=int(created_us)),
+        int(meeting_id)
+    )
+
+def get_meeting_buttons(meetings):
+    """Ряды кнопок встреч (дата - ОИВ) для списков встреч"""
     keyboard = []
-    for meeting in page_meetings:
+    for meeting in meetings:
         # Форматируем дату для отображения
         meeting_date = meeting['meeting_date'].strftime('%d.%m.%Y')
         button_text = f"{meeting_date} - {meeting['oiv_name']}"
@@ -152,13 +232,26 @@ def get_meetings_keyboard(meetings, page=0, meetings_per_page=10):
             callback_data=f"meeting_{meeting['id']}"
         )])
     
-    # Кнопки навигации
+    return keyboard
+
+def get_meetings_keyboard(page):
+    """Клавиатура со списком встреч (страница из db.get_meetings_page)"""
+    meetings = page['meetings']
+    keyboard = get_meeting_buttons(meetings)
+    
+    # Кнопки навигации (ключ первой/последней встречи на странице)
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data=f"prev_page_{page-1}"))
+    if meetings and page['has_prev']:
+        nav_buttons.append(InlineKeyboardButton(
+            "⬅️ Назад",
+            callback_data=f"prev_page_{encode_page_cursor(meetings[0])}"
+        ))
     
-    if end_idx < len(meetings):
-        nav_buttons.append(InlineKeyboardButton("Вперед ➡️", callback_data=f"next_page_{page}"))
+    if meetings and page['has_next']:
+        nav_buttons.append(InlineKeyboardButton(
+            "Вперед ➡️",
+            callback_data=f"next_page_{encode_page_cursor(meetings[-1])}"
+        ))
     
     if nav_buttons:
         keyboard.append(nav_buttons)
@@ -168,6 +261,24 @@ def get_meetings_keyboard(meetings, page=0, meetings_per_page=10):
     
     return InlineKeyboardMarkup(keyboard)
 
+# === РЕЗУЛЬТАТЫ ПОИСКА ===
+def get_search_keyboard(results, page=0):
+    """Клавиатура со страницей результатов поиска (из db.search_meetings)"""
+    keyboard = get_meeting_buttons(results['meetings'])
+    
+    # Кнопки навигации
+    nav_buttons = []
+    if results['has_prev']:
+        nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data=f"search_page_{page-1}"))
+    
+    if results['has_next']:
+        nav_buttons.append(InlineKeyboardButton("Вперед ➡️", callback_data=f"search_page_{page+1}"))
+    
+    if nav_buttons:
+        keyboard.append(nav_buttons)
+    
+    return InlineKeyboardMarkup(keyboard)
+
 # === ДЕТАЛИ ВСТРЕЧИ (для пользователя) ===
 def get_meeting_details_keyboard(meeting_id, user_role='user'):
     """Клавиатура для просмотра деталей встречи"""
@@ -216,6 +327,7 @@ def get_delete_confirmation_keyboard(meeting_id):
     return InlineKeyboardMarkup(keyboard)
 
 # === УПРАВЛЕНИЕ ПОЛЬЗОВАТЕЛЯМИ (админ) ===
+@lru_cache(maxsize=None)
 def get_users_admin_keyboard():
     """Клавиатура для управления пользователями"""
     keyboard = [
@@ -232,15 +344,58 @@ def get_users_admin_keyboard():
     ]
     return InlineKeyboardMarkup(keyboard)
 
+# === ПЕРИОД СТАТИСТИКИ (админ) ===
+@lru_cache(maxsize=None)
+def get_statistics_period_keyboard():
+    """Клавиатура выбора периода для статистики"""
+    keyboard = [
+        [
+            InlineKeyboardButton("📅 Эта неделя", callback_data="stats_period_week"),
+            InlineKeyboardButton("📅 Этот месяц", callback_data="stats_period_month")
+        ],
+        [
+            InlineKeyboardButton("📅 Этот квартал", callback_data="stats_period_quarter"),
+            InlineKeyboardButton("📅 Этот год", callback_data="stats_period_year")
+        ],
+        [
+            InlineKeyboardButton("⏮️ Прошлый месяц", callback_data="stats_period_prevmonth"),
+            InlineKeyboardButton("⏮️ Прошлый квартал", callback_data="stats_period_prevquarter")
+        ],
+        [
+            InlineKeyboardButton("🗓️ Свой период", callback_data="stats_period_custom"),
+            InlineKeyboardButton("♾️ За всё время", callback_data="stats_period_all")
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
 # === КАЛЕНДАРЬ (упрощенный) ===
-def get_calendar_keyboard(year=None, month=None):
-    """Упрощенная клавиатура-календарь"""
-    import datetime
+def get_calendar_keyboard(year=None, month=None, prefix="calendar", meeting_days=()):
+    """Упрощенная клавиатура-календарь (prefix - начало callback_data кнопок).
     
+    meeting_days - дни месяца, которые нужно отметить как занятые встречами.
+    """
+    today = datetime.now(TIMEZONE).date()
     if year is None or month is None:
-        now = datetime.datetime.now()
-        year = now.year
-        month = now.month
+        year = today.year
+        month = today.month
+    
+    # Сетка зависит от сегодняшней даты (отметка "сегодня"), поэтому она входит в ключ кэша
+    return build_calendar_keyboard(year, month, prefix, today, frozenset(meeting_days))
+
+async def get_meetings_calendar_keyboard(year=None, month=None, oiv_id=None, prefix="calendar"):
+    """Календарь с отметками дней, в которые уже есть встречи (с ОИВ или все)"""
+    if year is None or month is None:
+        today = datetime.now(TIMEZONE).date()
+        year = today.year
+        month = today.month
+    
+    day_counts = await db.get_meeting_day_counts(year, month, oiv_id)
+    return get_calendar_keyboard(year, month, prefix, meeting_days=day_counts.keys())
+
+@lru_cache(maxsize=256)
+def build_calendar_keyboard(year, month, prefix, today, meeting_days):
+    """Построение сетки календаря на месяц"""
+    import datetime
     
     # Заголовок с месяцем и годом
     month_names = [
@@ -264,7 +419,7 @@ def get_calendar_keyboard(year=None, month=None):
     keyboard.append([
         InlineKeyboardButton(
             f"{month_names[month-1]} {year}",
-            callback_data="calendar_header"
+            callback_data=f"{prefix}_header"
         )
     ])
     
@@ -284,9 +439,17 @@ def get_calendar_keyboard(year=None, month=None):
     # Кнопки с днями
     for day in range(1, days_in_month + 1):
         date_str = f"{year}-{month:02d}-{day:02d}"
+        
+        # [день] - сегодня, день• - уже есть встречи
+        label = str(day)
+        if datetime.date(year, month, day) == today:
+            label = f"[{label}]"
+        if day in meeting_days:
+            label += "•"
+        
         day_buttons.append(InlineKeyboardButton(
-            str(day), 
-            callback_data=f"calendar_day_{date_str}"
+            label,
+            callback_data=f"{prefix}_day_{date_str}"
         ))
         
         if len(day_buttons) == 7:
@@ -308,17 +471,17 @@ def get_calendar_keyboard(year=None, month=None):
     nav_row = [
         InlineKeyboardButton(
             "⬅️", 
-            callback_data=f"calendar_nav_{prev_year}_{prev_month}"
+            callback_data=f"{prefix}_nav_{prev_year}_{prev_month}"
         ),
-        InlineKeyboardButton("Сегодня", callback_data="calendar_today"),
+        InlineKeyboardButton("Сегодня", callback_data=f"{prefix}_today"),
         InlineKeyboardButton(
             "➡️", 
-            callback_data=f"calendar_nav_{next_year}_{next_month}"
+            callback_data=f"{prefix}_nav_{next_year}_{next_month}"
         )
     ]
     keyboard.append(nav_row)
     
     # Кнопка отмены
-    keyboard.append([InlineKeyboardButton("❌ Отменить", callback_data="calendar_cancel")])
+    keyboard.append([InlineKeyboardButton("❌ Отменить", callback_data=f"{prefix}_cancel")])
     
     return InlineKeyboardMarkup(keyboard)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест бота без Telegram: настоящее Application из bot.py работает
+с поддельным Bot API (fake_bot_api.py) и локальной БД, а N симулированных
+пользователей проходят сценарии добавления встречи, просмотра встреч и статистики.
+
+Пример: python load_test.py --users 50 --duration 120
+Запускать только на локальной БД: тестовые пользователи и их встречи удаляются в конце.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter, defaultdict
+
+API_PORT = 8081
+
+# Бот должен ходить только в поддельный Bot API: настройки задаются до импорта config
+os.environ['TELEGRAM_API_URL'] = f'http://127.0.0.1:{API_PORT}'
+os.environ['BOT_TOKEN'] = '123456:LOAD-TEST'
+
+from telegram import Update
+from bot import build_application
+from benchmark import summarize
+from database import db
+from fake_bot_api import FakeBotApi
+from synthetic_data import SYNTHETIC_USER_ID_START, SUMMARY_WORDS, seed_meetings, parse_count
+
+# Тестовые пользователи - после синтетических авторов встреч (ID тоже отрицательные)
+LOAD_USER_ID_START = SYNTHETIC_USER_ID_START + 1_000_000
+LOAD_USER_NAME = "Нагрузка"
+
+# Сколько ждать ответа бота на одно действие, секунд
+RESPONSE_TIMEOUT = 30
+
+# Сообщения рассылки администраторам не являются ответом на действие пользователя
+NOTIFICATION_PREFIX = "🔔"
+
+CONVERSATION_NAMES = ['add_meeting', 'edit_meeting', 'admin_users', 'statistics_period']
+
+class FlowError(Exception):
+    """Бот ответил не так, как ожидает сценарий"""
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.step_errors = Counter()
+        self.flows = Counter()
+        self.flow_errors = Counter()
+        self.notifications = 0
+
+class SimulatedUser:
+    def __init__(self, harness, user_id, role):
+        self.harness = harness
+        self.user_id = user_id
+        self.role = role
+        self.user = {'id': user_id, 'is_bot': False, 'first_name': f"{LOAD_USER_NAME} {user_id - LOAD_USER_ID_START}"}
+        self.inbox = asyncio.Queue()
+        self.message = None
+    
+    async def send(self, step, update_data):
+        """Отправка обновления боту и ожидание ответа: последнее сообщение бота"""
+        # Ответы на прошлые шаги, пришедшие после таймаута, больше не нужны
+        while not self.inbox.empty():
+            self.inbox.get_nowait()
+        
+        started = time.perf_counter()
+        await self.harness.put_update(update_data)
+        try:
+            self.message = await asyncio.wait_for(self.inbox.get(), RESPONSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.harness.stats.step_errors[step] += 1
+            raise FlowError(f"{step}: нет ответа за {RESPONSE_TIMEOUT} с")
+        self.harness.stats.latencies[step].append(time.perf_counter() - started)
+        return self.message
+    
+    async def text(self, step, text):
+        message = {
+            'message_id': self.harness.next_id(),
+            'date': int(time.time()),
+            'chat': {'id': self.user_id, 'type': 'private'},
+            'from': self.user,
+            'text': text
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return await self.send(step, {'update_id': self.harness.next_id(), 'message': message})
+    
+    async def press(self, step, prefix):
+        """Нажатие случайной кнопки последнего сообщения, callback_data которой начинается с prefix"""
+        buttons = [
+            button['callback_data']
+            for row in (self.message or {}).get('reply_markup', {}).get('inline_keyboard', [])
+            for button in row
+            if button.get('callback_data', '').startswith(prefix)
+        ]
+        if not buttons:
+            self.harness.stats.step_errors[step] += 1
+            raise FlowError(f"{step}: нет кнопки {prefix}*")
+        
+        callback_query = {
+            'id': str(self.harness.next_id()),
+            'from': self.user,
+            'chat_instance': str(self.user_id),
+            'message': self.message,
+            'data': random.choice(buttons)
+        }
+        return await self.send(step, {'update_id': self.harness.next_id(), 'callback_query': callback_query})
+    
+    async def think(self):
+        await asyncio.sleep(random.uniform(*self.harness.think_time))
+    
+    # === СЦЕНАРИИ ===
+    async def add_meeting(self):
+        await self.text('add.menu', "➕ Добавить встречу")
+        await self.think()
+        await self.press('add.complex', 'complex_')
+        await self.think()
+        await self.press('add.oiv', 'oiv_')
+        await self.think()
+        await self.press('add.date', 'calendar_day_')
+        await self.think()
+        message = await self.press('add.status', 'status_')
+        await self.think()
+        if 'длительность' in message['text']:
+            await self.text('add.duration', str(random.choice([30, 45, 60, 90])))
+            await self.think()
+        await self.text('add.summary', " ".join(random.choices(SUMMARY_WORDS, k=12)).capitalize())
+        await self.think()
+        await self.press('add.confirm', 'confirm_yes')
+    
+    async def view_meetings(self):
+        message = await self.text('view.menu', "📋 Просмотреть встречи")
+        if 'reply_markup' not in message:
+            return  # Встреч пока нет
+        await self.think()
+        await self.press('view.year', 'year_')
+        await self.think()
+        await self.press('view.month', 'month_')
+        await self.think()
+        await self.press('view.meeting', 'meeting_')
+        await self.think()
+        message = await self.press('view.back', 'back_to_meetings')
+        if any(
+            button.get('callback_data', '').startswith('next_page_')
+            for row in message.get('reply_markup', {}).get('inline_keyboard', []) for button in row
+        ):
+            await self.think()
+            await self.press('view.next_page', 'next_page_')
+    
+    async def statistics(self):
+        await self.text('stats.menu', "📊 Статистика")
+        for period in ('stats_period_month', 'stats_period_year', 'stats_period_all'):
+            await self.think()
+            await self.press(f'stats.{period[len("stats_period_"):]}', period)
+    
+    async def run(self, deadline):
+        """Сценарии по очереди до истечения времени теста"""
+        try:
+            await self.text('start', '/start')
+        except FlowError:
+            return
+        
+        flows = [self.add_meeting, self.view_meetings]
+        if self.role == 'admin':
+            flows.append(self.statistics)
+        
+        while time.monotonic() < deadline:
+            await self.think()
+            flow = random.choice(flows)
+            stats = self.harness.stats
+            try:
+                await flow()
+                stats.flows[flow.__name__] += 1
+            except FlowError as e:
+                stats.flow_errors[flow.__name__] += 1
+                logging.getLogger(__name__).debug(f"Пользователь {self.user_id}: {e}")
+                # Выходим из незавершенного диалога
+                try:
+                    await self.text('cancel', '/cancel')
+                except FlowError:
+                    pass
+
+class LoadHarness:
+    def __init__(self, think_time):
+        self.think_time = think_time
+        self.stats = LoadStats()
+        self.users = {}
+        self.counter = 0
+        self.api = FakeBotApi(on_message=self.on_message)
+        self.application = None
+    
+    def next_id(self):
+        self.counter += 1
+        return self.counter
+    
+    def on_message(self, method, message):
+        """Сообщение бота из поддельного Bot API -> входящие симулированного пользователя"""
+        if message['text'].startswith(NOTIFICATION_PREFIX):
+            self.stats.notifications += 1
+            return
+        user = self.users.get(message['chat']['id'])
+        if user:
+            user.inbox.put_nowait(message)
+    
+    async def put_update(self, data):
+        await self.application.update_queue.put(Update.de_json(data, self.application.bot))
+    
+    async def register_users(self, count, admin_share):
+        admins = max(1, round(count * admin_share)) if admin_share else 0
+        for index in range(count):
+            user_id = LOAD_USER_ID_START + index
+            role = 'admin' if index < admins else 'user'
+            await db.add_user(user_id, f"{LOAD_USER_NAME} {index}", role)
+            self.users[user_id] = SimulatedUser(self, user_id, role)
+    
+    async def cleanup(self):
+        """Удаление тестовых пользователей, их встреч и сохраненных сессий"""
+        user_ids = list(self.users)
+        for user_id in user_ids:
+            await db.delete_user(user_id)
+        async with db.get_cursor() as cursor:
+            await cursor.execute(
+                "DELETE FROM meetings WHERE user_id >= %s AND user_id < %s",
+                (LOAD_USER_ID_START, LOAD_USER_ID_START + len(user_ids))
+            )
+        await db.save_bot_user_data([], user_ids)
+        for name in CONVERSATION_NAMES:
+            rows = await db.get_bot_conversations(name)
+            keys = [(name, row['key']) for row in rows if set(json.loads(row['key'])) & set(user_ids)]
+            await db.save_bot_conversations([], keys)
+    
+    async def run(self, args):
+        application = self.application = build_application()
+        await self.api.start(port=API_PORT)
+        
+        # Жизненный цикл как в webhook.py; очистка - до закрытия пула БД в post_shutdown
+        await application.initialize()
+        try:
+            await application.post_init(application)
+            if args.seed:
+                await seed_meetings(parse_count(args.seed))
+            await self.register_users(args.users, args.admin_share)
+            await application.start()
+            try:
+                started = time.monotonic()
+                deadline = started + args.duration
+                tasks = []
+                for index, user in enumerate(self.users.values()):
+                    # Пользователи подключаются постепенно в течение ramp_up секунд
+                    delay = args.ramp_up * index / len(self.users)
+                    tasks.append(asyncio.create_task(self.run_user(user, delay, deadline)))
+                await asyncio.gather(*tasks)
+                elapsed = time.monotonic() - started
+            finally:
+                await application.stop()
+                await application.post_stop(application)
+        finally:
+            await application.shutdown()
+            try:
+                await self.cleanup()
+            finally:
+                await application.post_shutdown(application)
+                await self.api.stop()
+        
+        return elapsed
+    
+    async def run_user(self, user, delay, deadline):
+        await asyncio.sleep(delay)
+        await user.run(deadline)
+    
+    def report(self, elapsed):
+        """Пропускная способность, задержки по шагам и доля ошибок; возвращает число ошибок"""
+        stats = self.stats
+        steps = sum(len(values) for values in stats.latencies.values())
+        flows = sum(stats.flows.values())
+        print(f"\nПользователей: {len(self.users)}, длительность {elapsed:.0f} с")
+        print(f"Шагов: {steps} ({steps / elapsed:.1f}/с), сценариев: {flows} ({flows / elapsed * 60:.1f}/мин)")
+        print(f"Вызовы Bot API: {dict(self.api.calls)}, уведомлений администраторам: {stats.notifications}")
+        
+        print(f"\n{'шаг':<22} {'число':>7} {'ошибок':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+        for step in sorted(set(stats.latencies) | set(stats.step_errors)):
+            values = stats.latencies.get(step, [])
+            line = f"{step:<22} {len(values):>7} {stats.step_errors[step]:>7}"
+            if values:
+                summary = summarize(values)
+                line += " " + " ".join(f"{summary[key]:>9.1f}" for key in ('p50', 'p95', 'p99', 'max'))
+            print(line)
+        print("Время в миллисекундах.")
+        
+        print(f"\n{'сценарий':<22} {'успешно':>8} {'ошибок':>7} {'доля ошибок':>12}")
+        for flow in sorted(set(stats.flows) | set(stats.flow_errors)):
+            total = stats.flows[flow] + stats.flow_errors[flow]
+            print(f"{flow:<22} {stats.flows[flow]:>8} {stats.flow_errors[flow]:>7} {stats.flow_errors[flow] / total:>11.1%}")
+        
+        return sum(stats.flow_errors.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бота с поддельным Bot API")
+    parser.add_argument('--users', type=int, default=20, help="Число симулированных пользователей")
+    parser.add_argument('--duration', type=float, default=60, help="Длительность теста, секунд")
+    parser.add_argument('--ramp-up', type=float, default=10, help="За сколько секунд подключаются все пользователи")
+    parser.add_argument('--think-min', type=float, default=0.5, help="Минимальная пауза между действиями, секунд")
+    parser.add_argument('--think-max', type=float, default=3.0, help="Максимальная пауза между действиями, секунд")
+    parser.add_argument('--admin-share', type=float, default=0.2, help="Доля администраторов (сценарий статистики)")
+    parser.add_argument('--seed', help="Перед тестом создать синтетические встречи (10k, 100k, 1M)")
+    args = parser.parse_args()
+    
+    # Логи бота о каждом запросе мешают отчету
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    harness = LoadHarness((args.think_min, args.think_max))
+    elapsed = asyncio.run(harness.run(args))
+    return 1 if harness.report(elapsed) else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
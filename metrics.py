@@ -0,0 +1,161 @@
+"""
+Метрики Prometheus: время и число вызовов обработчиков и запросов к БД,
+активные диалоги и размеры кэшей. Отдаются в текстовом формате на локальном порту.
+"""
+
+import inspect
+import time
+from functools import wraps
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from telegram.ext import ConversationHandler
+import states
+from query_log import current_method
+
+HANDLER_CALLS = Counter(
+    'bot_handler_calls_total', "Вызовы обработчиков обновлений",
+    ['handler', 'state', 'outcome']
+)
+HANDLER_LATENCY = Histogram(
+    'bot_handler_duration_seconds', "Время работы обработчиков обновлений",
+    ['handler', 'state', 'outcome']
+)
+QUERY_CALLS = Counter(
+    'bot_db_queries_total', "Вызовы методов Database",
+    ['query', 'outcome']
+)
+QUERY_LATENCY = Histogram(
+    'bot_db_query_duration_seconds', "Время работы методов Database",
+    ['query', 'outcome']
+)
+ACTIVE_CONVERSATIONS = Gauge(
+    'bot_active_conversations', "Незавершенные диалоги",
+    ['conversation']
+)
+CACHE_ITEMS = Gauge(
+    'bot_cache_items', "Число элементов в кэшах процесса",
+    ['cache']
+)
+
+# Имена состояний диалогов для меток (значение -> имя константы из states.py)
+STATE_NAMES = {
+    value: name for name, value in vars(states).items()
+    if name.isupper() and isinstance(value, int)
+}
+STATE_NAMES[ConversationHandler.TIMEOUT] = 'TIMEOUT'
+
+def observe(calls, latency, labels, started):
+    """Учет одного вызова в счетчике и гистограмме"""
+    calls.labels(*labels).inc()
+    latency.labels(*labels).observe(time.perf_counter() - started)
+
+# === БАЗА ДАННЫХ ===
+def timed(method):
+    """Декоратор метода Database: время и исход запроса с меткой query=имя метода"""
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        # Имя метода нужно и журналу медленных запросов
+        token = current_method.set(method.__name__)
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return await method(*args, **kwargs)
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            observe(QUERY_CALLS, QUERY_LATENCY, (method.__name__, outcome), started)
+            current_method.reset(token)
+    return wrapper
+
+def timed_generator(method):
+    """Декоратор асинхронного генератора Database: время от первого запроса
+    до исчерпания или закрытия генератора"""
+    @wraps(method)
+    async def wrapper(*args, **kwargs):
+        generator = method(*args, **kwargs)
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            while True:
+                # Имя метода выставляется только на время работы генератора,
+                # между строками код вызывающего идет под своим именем
+                token = current_method.set(method.__name__)
+                try:
+                    item = await generator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    current_method.reset(token)
+                yield item
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            token = current_method.set(method.__name__)
+            try:
+                await generator.aclose()
+            finally:
+                current_method.reset(token)
+                observe(QUERY_CALLS, QUERY_LATENCY, (method.__name__, outcome), started)
+    return wrapper
+
+def instrument_class(cls):
+    """Декоратор класса: timed для всех публичных async-методов и асинхронных генераторов"""
+    for name, attr in list(vars(cls).items()):
+        if name.startswith('_'):
+            continue
+        if inspect.iscoroutinefunction(attr):
+            setattr(cls, name, timed(attr))
+        elif inspect.isasyncgenfunction(attr):
+            setattr(cls, name, timed_generator(attr))
+    return cls
+
+# === ОБРАБОТЧИКИ ===
+def instrument_handler(handler, state):
+    """Подмена callback обработчика на версию с замером времени"""
+    callback = handler.callback
+    name = getattr(callback, '__name__', type(handler).__name__)
+    
+    @wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return await callback(update, context)
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            observe(HANDLER_CALLS, HANDLER_LATENCY, (name, state, outcome), started)
+    
+    handler.callback = wrapper
+
+def instrument_handlers(application):
+    """Замер всех зарегистрированных обработчиков, включая вложенные в ConversationHandler"""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if not isinstance(handler, ConversationHandler):
+                instrument_handler(handler, '-')
+                continue
+            
+            for entry_point in handler.entry_points:
+                instrument_handler(entry_point, 'entry')
+            for state, state_handlers in handler.states.items():
+                for state_handler in state_handlers:
+                    instrument_handler(state_handler, STATE_NAMES.get(state, str(state)))
+            for fallback in handler.fallbacks:
+                instrument_handler(fallback, 'fallback')
+            
+            ACTIVE_CONVERSATIONS.labels(handler.name).set_function(
+                lambda handler=handler: sum(
+                    1 for state in handler._conversations.values() if state is not None
+                )
+            )
+
+def register_cache_gauge(cache, size_function):
+    """Метрика размера кэша, вычисляемая при каждом чтении метрик"""
+    CACHE_ITEMS.labels(cache).set_function(size_function)
+
+def start_metrics_server(port):
+    """HTTP-сервер метрик на локальном интерфейсе (в отдельном потоке)"""
+    start_http_server(port, addr='127.0.0.1')
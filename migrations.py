@@ -0,0 +1,316 @@
+"""
+Версионные миграции схемы базы данных.
+Применяются при деплое (init_db.py), бот при запуске только проверяет версию.
+"""
+
+# Каждая миграция: (версия, описание, список SQL-команд)
+MIGRATIONS = [
+    (1, "Базовые таблицы", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL UNIQUE,
+            full_name TEXT,
+            role TEXT NOT NULL DEFAULT 'user',
+            registered_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS complexes (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS oivs (
+            id SERIAL PRIMARY KEY,
+            complex_id INTEGER NOT NULL REFERENCES complexes(id),
+            name TEXT NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS meetings (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            user_name TEXT,
+            oiv_id INTEGER NOT NULL REFERENCES oivs(id),
+            meeting_date DATE NOT NULL,
+            status TEXT NOT NULL,
+            duration_minutes INTEGER,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "Индексы для выборок встреч по датам", [
+        # Ключ постраничного просмотра (meeting_date, created_at, id) не должен содержать NULL
+        "UPDATE meetings SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL",
+        "ALTER TABLE meetings ALTER COLUMN created_at SET NOT NULL",
+        """
+        CREATE INDEX IF NOT EXISTS meetings_date_idx
+        ON meetings (meeting_date DESC, created_at DESC, id DESC)
+        """,
+        "CREATE INDEX IF NOT EXISTS meetings_oiv_date_idx ON meetings (oiv_id, meeting_date)",
+        "CREATE INDEX IF NOT EXISTS meetings_user_date_idx ON meetings (user_id, meeting_date)",
+        "CREATE INDEX IF NOT EXISTS oivs_complex_idx ON oivs (complex_id)",
+    ]),
+    (3, "Сводная таблица встреч по месяцам с триггерами", [
+        """
+        CREATE TABLE IF NOT EXISTS meeting_month_counts (
+            year INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            total_duration BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (year, month, status)
+        )
+        """,
+        """
+        CREATE OR REPLACE FUNCTION meeting_month_counts_apply(
+            p_date DATE, p_status TEXT, p_count INTEGER, p_duration BIGINT
+        ) RETURNS void AS $$
+        DECLARE
+            v_year INTEGER := EXTRACT(YEAR FROM p_date);
+            v_month INTEGER := EXTRACT(MONTH FROM p_date);
+        BEGIN
+            INSERT INTO meeting_month_counts (year, month, status, count, total_duration)
+            VALUES (v_year, v_month, p_status, p_count, p_duration)
+            ON CONFLICT (year, month, status) DO UPDATE
+            SET count = meeting_month_counts.count + EXCLUDED.count,
+                total_duration = meeting_month_counts.total_duration + EXCLUDED.total_duration;
+            
+            -- Пустые месяцы не должны попадать в навигатор
+            IF p_count < 0 THEN
+                DELETE FROM meeting_month_counts
+                WHERE year = v_year AND month = v_month AND status = p_status AND count <= 0;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION meetings_month_counts_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM meeting_month_counts;
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM meeting_month_counts_apply(
+                    OLD.meeting_date, OLD.status, -1, -COALESCE(OLD.duration_minutes, 0)
+                );
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM meeting_month_counts_apply(
+                    NEW.meeting_date, NEW.status, 1, COALESCE(NEW.duration_minutes, 0)
+                );
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        # Блокируем запись во время заполнения, чтобы не потерять параллельные изменения
+        "LOCK TABLE meetings IN SHARE ROW EXCLUSIVE MODE",
+        "DROP TRIGGER IF EXISTS meetings_month_counts ON meetings",
+        """
+        CREATE TRIGGER meetings_month_counts
+        AFTER INSERT OR DELETE OR UPDATE OF meeting_date, status, duration_minutes ON meetings
+        FOR EACH ROW EXECUTE FUNCTION meetings_month_counts_trigger()
+        """,
+        "DROP TRIGGER IF EXISTS meetings_month_counts_truncate ON meetings",
+        """
+        CREATE TRIGGER meetings_month_counts_truncate
+        AFTER TRUNCATE ON meetings
+        FOR EACH STATEMENT EXECUTE FUNCTION meetings_month_counts_trigger()
+        """,
+        "DELETE FROM meeting_month_counts",
+        """
+        INSERT INTO meeting_month_counts (year, month, status, count, total_duration)
+        SELECT
+            EXTRACT(YEAR FROM meeting_date)::int,
+            EXTRACT(MONTH FROM meeting_date)::int,
+            status,
+            COUNT(*),
+            COALESCE(SUM(duration_minutes), 0)
+        FROM meetings
+        GROUP BY 1, 2, 3
+        """,
+    ]),
+    (4, "Кэш статистики за закрытые периоды", [
+        """
+        CREATE TABLE IF NOT EXISTS statistics_cache (
+            period_start DATE NOT NULL,
+            period_end DATE NOT NULL,
+            top_n INTEGER NOT NULL,
+            payload JSONB NOT NULL,
+            computed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (period_start, period_end, top_n)
+        )
+        """,
+        # Встречу можно добавить или исправить задним числом:
+        # сбрасываем кэш всех периодов, которые она затрагивает
+        """
+        CREATE OR REPLACE FUNCTION statistics_cache_invalidate() RETURNS trigger AS $$
+        BEGIN
+            IF TG_TABLE_NAME <> 'meetings' OR TG_OP = 'TRUNCATE' THEN
+                DELETE FROM statistics_cache;
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM statistics_cache
+                WHERE OLD.meeting_date BETWEEN period_start AND period_end;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                DELETE FROM statistics_cache
+                WHERE NEW.meeting_date BETWEEN period_start AND period_end;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS meetings_statistics_cache ON meetings",
+        """
+        CREATE TRIGGER meetings_statistics_cache
+        AFTER INSERT OR DELETE OR UPDATE OF meeting_date, status, oiv_id ON meetings
+        FOR EACH ROW EXECUTE FUNCTION statistics_cache_invalidate()
+        """,
+        "DROP TRIGGER IF EXISTS meetings_statistics_cache_truncate ON meetings",
+        """
+        CREATE TRIGGER meetings_statistics_cache_truncate
+        AFTER TRUNCATE ON meetings
+        FOR EACH STATEMENT EXECUTE FUNCTION statistics_cache_invalidate()
+        """,
+        # Переименование комплексов и ОИВ меняет подписи в сохраненных отчетах
+        "DROP TRIGGER IF EXISTS complexes_statistics_cache ON complexes",
+        """
+        CREATE TRIGGER complexes_statistics_cache
+        AFTER UPDATE OR DELETE ON complexes
+        FOR EACH STATEMENT EXECUTE FUNCTION statistics_cache_invalidate()
+        """,
+        "DROP TRIGGER IF EXISTS oivs_statistics_cache ON oivs",
+        """
+        CREATE TRIGGER oivs_statistics_cache
+        AFTER UPDATE OR DELETE ON oivs
+        FOR EACH STATEMENT EXECUTE FUNCTION statistics_cache_invalidate()
+        """,
+    ]),
+    (5, "Полнотекстовый поиск по содержанию встреч", [
+        """
+        ALTER TABLE meetings ADD COLUMN IF NOT EXISTS summary_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('russian', summary)) STORED
+        """,
+        "CREATE INDEX IF NOT EXISTS meetings_summary_tsv_idx ON meetings USING GIN (summary_tsv)",
+    ]),
+    (6, "Уведомления об изменении справочников", [
+        # Бот держит комплексы и ОИВ в памяти и перечитывает их по уведомлению
+        """
+        CREATE OR REPLACE FUNCTION reference_changed_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('reference_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS complexes_reference_changed ON complexes",
+        """
+        CREATE TRIGGER complexes_reference_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON complexes
+        FOR EACH STATEMENT EXECUTE FUNCTION reference_changed_notify()
+        """,
+        "DROP TRIGGER IF EXISTS oivs_reference_changed ON oivs",
+        """
+        CREATE TRIGGER oivs_reference_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON oivs
+        FOR EACH STATEMENT EXECUTE FUNCTION reference_changed_notify()
+        """,
+    ]),
+    (7, "Хранение состояния бота (user_data и диалоги)", [
+        """
+        CREATE TABLE IF NOT EXISTS bot_user_data (
+            user_id BIGINT PRIMARY KEY,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bot_conversations (
+            name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            state JSONB NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (name, key)
+        )
+        """,
+    ]),
+    (8, "Индекс для напоминаний о запланированных встречах", [
+        "CREATE INDEX IF NOT EXISTS meetings_status_date_idx ON meetings (status, meeting_date)",
+    ]),
+    (9, "Время изменения статуса и водяной знак сводки для админов", [
+        "ALTER TABLE meetings ADD COLUMN IF NOT EXISTS status_changed_at TIMESTAMP WITH TIME ZONE",
+        "UPDATE meetings SET status_changed_at = created_at WHERE status_changed_at IS NULL",
+        "ALTER TABLE meetings ALTER COLUMN status_changed_at SET DEFAULT CURRENT_TIMESTAMP",
+        "ALTER TABLE meetings ALTER COLUMN status_changed_at SET NOT NULL",
+        """
+        CREATE OR REPLACE FUNCTION meetings_status_changed_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.status IS DISTINCT FROM OLD.status THEN
+                NEW.status_changed_at := CURRENT_TIMESTAMP;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS meetings_status_changed ON meetings",
+        """
+        CREATE TRIGGER meetings_status_changed
+        BEFORE UPDATE OF status ON meetings
+        FOR EACH ROW EXECUTE FUNCTION meetings_status_changed_trigger()
+        """,
+        "CREATE INDEX IF NOT EXISTS meetings_created_at_idx ON meetings (created_at)",
+        "CREATE INDEX IF NOT EXISTS meetings_status_changed_at_idx ON meetings (status_changed_at)",
+        """
+        CREATE TABLE IF NOT EXISTS digest_state (
+            name TEXT PRIMARY KEY,
+            watermark TIMESTAMP WITH TIME ZONE NOT NULL
+        )
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def apply_migrations(conn):
+    """Применение недостающих миграций через синхронное соединение psycopg"""
+    cursor = conn.cursor()
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        # Блокировка защищает от параллельного деплоя двух экземпляров
+        cursor.execute("LOCK TABLE schema_version IN EXCLUSIVE MODE")
+        cursor.execute("SELECT 1 FROM schema_version WHERE version = %s", (version,))
+        
+        if cursor.fetchone():
+            conn.rollback()
+            continue
+        
+        print(f"Миграция {version}: {description}...")
+        for statement in statements:
+            cursor.execute(statement)
+        
+        cursor.execute(
+            "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+            (version, description)
+        )
+        conn.commit()
+        applied.append(version)
+    
+    cursor.close()
+    return applied
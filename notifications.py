@@ -0,0 +1,171 @@
+"""
+Уведомления администраторов о новых, измененных и удаленных встречах.
+Обработчики только кладут событие в очередь; фоновая задача собирает
+события в сводку и рассылает ее с учетом ограничений Telegram на частоту сообщений.
+"""
+
+import asyncio
+import logging
+import time
+from telegram.error import Forbidden, RetryAfter, TelegramError
+from config import ADMIN_IDS
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Ограничения Telegram: ~30 сообщений в секунду всего и ~1 в секунду в один чат
+GLOBAL_RATE = 25
+PER_CHAT_INTERVAL = 1.0
+
+# Сколько ждать следующих событий, чтобы объединить их в одну сводку, секунд
+COALESCE_DELAY = 5
+MAX_EVENTS_PER_DIGEST = 50
+
+MAX_MESSAGE_LENGTH = 4096
+MAX_QUEUE_SIZE = 1000
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Разбиение длинного текста на сообщения по границам строк"""
+    parts = []
+    current = ""
+    for line in text.split("\n"):
+        # Строка длиннее лимита режется как есть
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        
+        if current and len(current) + 1 + len(line) > limit:
+            parts.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    
+    if current:
+        parts.append(current)
+    return parts
+
+async def get_admin_chat_ids():
+    """Telegram ID администраторов: из ADMIN_IDS и с ролью admin в БД"""
+    return sorted(set(ADMIN_IDS) | set(await db.get_admin_ids()))
+
+class RateLimiter:
+    """Интервалы между отправками: общий и для каждого чата"""
+    
+    def __init__(self, global_rate=GLOBAL_RATE, per_chat_interval=PER_CHAT_INTERVAL):
+        self.global_interval = 1 / global_rate
+        self.per_chat_interval = per_chat_interval
+        self.next_global = 0
+        self.next_chat = {}
+    
+    async def wait(self, chat_id):
+        """Ожидание, пока в чат можно отправить следующее сообщение"""
+        now = time.monotonic()
+        send_at = max(now, self.next_global, self.next_chat.get(chat_id, 0))
+        self.next_global = send_at + self.global_interval
+        self.next_chat[chat_id] = send_at + self.per_chat_interval
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+class AdminNotifier:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+        self.limiter = RateLimiter()
+        self.bot = None
+        self.worker = None
+    
+    def notify(self, text, actor_id=None):
+        """Постановка события в очередь (не ждет отправки).
+        
+        text - строка сводки в HTML, actor_id - кто внес изменение (ему не отправляем)
+        """
+        try:
+            self.queue.put_nowait((text, actor_id))
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь уведомлений переполнена, событие пропущено: {text}")
+    
+    def start(self, bot):
+        """Запуск фоновой рассылки"""
+        self.bot = bot
+        if not self.worker:
+            self.worker = asyncio.create_task(self.run())
+    
+    async def stop(self, timeout=10):
+        """Остановка рассылки (с попыткой доставить уже поставленные события)"""
+        if not self.worker:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не доставлено уведомлений: {self.queue.qsize()}")
+        self.worker.cancel()
+        try:
+            await self.worker
+        except asyncio.CancelledError:
+            pass
+        self.worker = None
+    
+    async def collect_events(self):
+        """Первое событие и все, что пришло следом за COALESCE_DELAY секунд"""
+        events = [await self.queue.get()]
+        deadline = time.monotonic() + COALESCE_DELAY
+        
+        while len(events) < MAX_EVENTS_PER_DIGEST:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                events.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        return events
+    
+    async def run(self):
+        """Фоновая задача: сводка событий и рассылка администраторам"""
+        while True:
+            events = await self.collect_events()
+            try:
+                await self.deliver(events)
+            except Exception as e:
+                logger.error(f"Ошибка рассылки уведомлений: {e}")
+            finally:
+                for _ in events:
+                    self.queue.task_done()
+    
+    async def deliver(self, events):
+        """Отправка сводки каждому администратору (без его собственных действий)"""
+        for admin_id in await get_admin_chat_ids():
+            lines = [text for text, actor_id in events if actor_id != admin_id]
+            if not lines:
+                continue
+            
+            header = "🔔 <b>Изменения встреч</b>" if len(lines) == 1 else f"🔔 <b>Изменения встреч ({len(lines)})</b>"
+            for part in split_message(header + "\n\n" + "\n".join(lines)):
+                await self.send(admin_id, part)
+    
+    async def send(self, chat_id, text, reply_markup=None):
+        """Отправка одного сообщения с ожиданием лимита и повтором после RetryAfter.
+        
+        Возвращает True, если сообщение доставлено.
+        """
+        for _ in range(3):
+            await self.limiter.wait(chat_id)
+            try:
+                await self.bot.send_message(chat_id, text, parse_mode='HTML', reply_markup=reply_markup)
+                return True
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except Forbidden:
+                # Пользователь заблокировал бота или еще не писал ему
+                logger.warning(f"Нельзя отправить сообщение в чат {chat_id}")
+                return False
+            except TelegramError as e:
+                logger.error(f"Ошибка отправки сообщения в чат {chat_id}: {e}")
+                return False
+        return False
+
+# Глобальный рассыльщик уведомлений
+notifier = AdminNotifier()
@@ -0,0 +1,88 @@
+"""
+Нечеткий поиск ОИВ по введенному фрагменту названия.
+Триграммный индекс строится в памяти по справочнику ОИВ (около 50 записей).
+"""
+
+import re
+
+def normalize_name(text):
+    """Нормализация названия: нижний регистр, ё -> е, только буквы и цифры"""
+    text = text.lower().replace('ё', 'е')
+    return re.sub(r'[^0-9a-zа-я]+', ' ', text).strip()
+
+def trigrams(text):
+    """Множество триграмм слов (как в pg_trgm: слово дополняется пробелами)"""
+    result = set()
+    for word in normalize_name(text).split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i+3])
+    return result
+
+class OivSearchIndex:
+    def __init__(self):
+        self.oivs = {}
+        self.names = {}
+        self.trigrams = {}
+        self.by_trigram = {}
+    
+    def build(self, oivs):
+        """Построение индекса по строкам ОИВ (id, name, complex_id)"""
+        index_oivs = {}
+        index_names = {}
+        index_trigrams = {}
+        by_trigram = {}
+        
+        for oiv in oivs:
+            oiv_trigrams = trigrams(oiv['name'])
+            index_oivs[oiv['id']] = oiv
+            index_names[oiv['id']] = normalize_name(oiv['name'])
+            index_trigrams[oiv['id']] = oiv_trigrams
+            for trigram in oiv_trigrams:
+                by_trigram.setdefault(trigram, set()).add(oiv['id'])
+        
+        # Подменяем целиком, чтобы параллельные поиски не видели полупостроенный индекс
+        self.oivs, self.names = index_oivs, index_names
+        self.trigrams, self.by_trigram = index_trigrams, by_trigram
+    
+    def get(self, oiv_id):
+        """ОИВ по ID (или None)"""
+        return self.oivs.get(oiv_id)
+    
+    def search(self, text, limit=6, threshold=0.3):
+        """Поиск ОИВ, наиболее похожих на фрагмент: список (score, oiv) по убыванию"""
+        query = normalize_name(text)
+        if not query:
+            return []
+        
+        query_trigrams = trigrams(query)
+        candidates = set()
+        for trigram in query_trigrams:
+            candidates |= self.by_trigram.get(trigram, set())
+        
+        # Подстрока может не дать общих триграмм (короткий ввод), проверяем и ее
+        for oiv_id, name in self.names.items():
+            if query in name:
+                candidates.add(oiv_id)
+        
+        matches = []
+        for oiv_id in candidates:
+            oiv = self.oivs[oiv_id]
+            name = self.names[oiv_id]
+            
+            if name == query:
+                score = 1.0
+            else:
+                oiv_trigrams = self.trigrams[oiv_id]
+                score = len(query_trigrams & oiv_trigrams) / len(query_trigrams | oiv_trigrams)
+                if query in name:
+                    score = min(score + 0.3, 0.99)
+            
+            if score >= threshold:
+                matches.append((score, oiv))
+        
+        matches.sort(key=lambda match: (-match[0], match[1]['name']))
+        return matches[:limit]
+
+# Глобальный индекс ОИВ (строится при запуске бота)
+oiv_index = OivSearchIndex()
@@ -0,0 +1,206 @@
+"""
+Хранение user_data и состояний диалогов в PostgreSQL.
+Данные пользователя загружаются при первом обращении, изменения пишутся пачками.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import date, datetime
+from telegram.ext import BasePersistence, PersistenceInput
+from database import db
+from migrations import LATEST_VERSION
+
+logger = logging.getLogger(__name__)
+
+def encode_value(value):
+    """Сериализация в JSON значений, которых нет в JSON (даты)"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    raise TypeError(f"Тип {type(value).__name__} нельзя сохранить в состоянии бота")
+
+def decode_object(obj):
+    """Восстановление значений, сохраненных encode_value"""
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    return obj
+
+def dumps(value):
+    return json.dumps(value, default=encode_value, ensure_ascii=False)
+
+def loads(text):
+    return json.loads(text, object_hook=decode_object)
+
+class PostgresPersistence(BasePersistence):
+    """Persistence для python-telegram-bot поверх таблиц bot_user_data и bot_conversations.
+    
+    Application сам вызывает update_* раз в update_interval секунд для изменившихся
+    пользователей; здесь они только помечаются, а в БД уходят одним пакетом.
+    """
+    
+    def __init__(self, update_interval=60):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.loaded_users = set()
+        self.dirty_users = {}
+        self.dropped_users = set()
+        # Удаления, которые уже пишутся в БД (dropped_users к этому моменту очищен)
+        self.deleting_users = set()
+        self.dirty_conversations = {}
+        self.write_task = None
+        self.ready = False
+    
+    async def ensure_ready(self):
+        """Persistence загружается до post_init, поэтому пул открываем здесь"""
+        if not self.ready:
+            await db.connect()
+            await db.check_schema(LATEST_VERSION)
+            self.ready = True
+    
+    # === ЗАГРУЗКА ===
+    async def get_user_data(self):
+        # Данные пользователей грузятся лениво в refresh_user_data
+        await self.ensure_ready()
+        return {}
+    
+    def is_dropped(self, user_id):
+        """Данные пользователя удалены, но удаление еще не записано в БД"""
+        return user_id in self.dropped_users or user_id in self.deleting_users
+    
+    async def refresh_user_data(self, user_id, user_data):
+        if user_id in self.loaded_users:
+            return
+        
+        # Строка в БД еще старая: загрузив ее, мы бы вернули удаленные данные
+        if self.is_dropped(user_id):
+            self.loaded_users.add(user_id)
+            return
+        
+        data = await db.get_bot_user_data(user_id)
+        # Пока шло чтение, данные могли удалить или уже загрузить
+        if user_id in self.loaded_users or self.is_dropped(user_id):
+            return
+        self.loaded_users.add(user_id)
+        if data:
+            # Не затираем то, что уже успело попасть в user_data
+            for key, value in loads(data).items():
+                user_data.setdefault(key, value)
+    
+    async def get_conversations(self, name):
+        # Незавершенных диалогов немного, их нужно знать сразу при запуске
+        await self.ensure_ready()
+        rows = await db.get_bot_conversations(name)
+        return {tuple(json.loads(row['key'])): loads(row['state']) for row in rows}
+    
+    async def get_chat_data(self):
+        return {}
+    
+    async def get_bot_data(self):
+        return {}
+    
+    async def get_callback_data(self):
+        return None
+    
+    # === ЗАПИСЬ ===
+    async def update_user_data(self, user_id, data):
+        self.loaded_users.add(user_id)
+        self.dropped_users.discard(user_id)
+        self.dirty_users[user_id] = data
+        self.schedule_write()
+    
+    async def drop_user_data(self, user_id):
+        self.loaded_users.discard(user_id)
+        self.dirty_users.pop(user_id, None)
+        self.dropped_users.add(user_id)
+        self.schedule_write()
+    
+    async def update_conversation(self, name, key, new_state):
+        self.dirty_conversations[(name, json.dumps(list(key)))] = new_state
+        self.schedule_write()
+    
+    async def update_chat_data(self, chat_id, data):
+        pass
+    
+    async def drop_chat_data(self, chat_id):
+        pass
+    
+    async def update_bot_data(self, data):
+        pass
+    
+    async def update_callback_data(self, data):
+        pass
+    
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+    
+    async def refresh_bot_data(self, bot_data):
+        pass
+    
+    def schedule_write(self):
+        """Запуск записи после того, как Application передаст все изменения за проход"""
+        if not self.write_task or self.write_task.done():
+            self.write_task = asyncio.create_task(self.write_dirty())
+    
+    async def write_dirty(self):
+        """Запись накопленных изменений в БД пакетом"""
+        # Даем Application досдать изменения текущего прохода (они приходят через gather)
+        await asyncio.sleep(0)
+        
+        dirty_users, self.dirty_users = self.dirty_users, {}
+        dropped_users, self.dropped_users = self.dropped_users, set()
+        dirty_conversations, self.dirty_conversations = self.dirty_conversations, {}
+        
+        # Пустые user_data не храним. Значение, которое нельзя сериализовать, пропускаем:
+        # повторная попытка не поможет, а остальные изменения прохода терять нельзя
+        user_rows = []
+        for user_id, data in dirty_users.items():
+            if data:
+                try:
+                    user_rows.append((user_id, dumps(data)))
+                except (TypeError, ValueError) as e:
+                    logger.error(f"user_data пользователя {user_id} не сохранены: {e}")
+        deleted_ids = dropped_users | {user_id for user_id, data in dirty_users.items() if not data}
+        
+        # Завершенный диалог (состояние None) удаляем
+        conversation_rows = []
+        for (name, key), state in dirty_conversations.items():
+            if state is not None:
+                try:
+                    conversation_rows.append((name, key, dumps(state)))
+                except (TypeError, ValueError) as e:
+                    logger.error(f"Состояние диалога {name} {key} не сохранено: {e}")
+        deleted_keys = [key for key, state in dirty_conversations.items() if state is None]
+        
+        self.deleting_users = deleted_ids
+        try:
+            await db.save_bot_user_data(user_rows, deleted_ids)
+            await db.save_bot_conversations(conversation_rows, deleted_keys)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения состояния бота: {e}")
+            # Возвращаем изменения, чтобы записать их при следующем проходе
+            for user_id, data in dirty_users.items():
+                self.dirty_users.setdefault(user_id, data)
+            self.dropped_users |= dropped_users - self.dirty_users.keys()
+            for key, state in dirty_conversations.items():
+                self.dirty_conversations.setdefault(key, state)
+            return
+        finally:
+            self.deleting_users = set()
+        
+        logger.debug(
+            f"Состояние бота сохранено: пользователей {len(user_rows) + len(deleted_ids)}, "
+            f"диалогов {len(dirty_conversations)}"
+        )
+    
+    async def flush(self):
+        """Запись всего несохраненного при остановке бота"""
+        if self.write_task:
+            await self.write_task
+        if self.dirty_users or self.dropped_users or self.dirty_conversations:
+            await self.write_dirty()
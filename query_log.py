@@ -0,0 +1,115 @@
+"""
+Журнал медленных запросов к БД.
+Запросы дольше порога пишутся в лог с именем метода Database; для части медленных
+SELECT план выполнения (EXPLAIN ANALYZE) сохраняется в отдельный файл с ротацией.
+"""
+
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from psycopg import AsyncCursor
+from config import SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN_RATE, SLOW_QUERY_PLAN_FILE
+
+logger = logging.getLogger(__name__)
+
+# Метод Database, который сейчас выполняется (выставляет metrics.timed)
+current_method = ContextVar('current_method', default='-')
+
+# Планы пишутся в отдельный файл, а не в общий лог
+PLAN_FILE_MAX_BYTES = 1024 * 1024
+PLAN_FILE_BACKUPS = 5
+
+plan_logger = logging.getLogger(__name__ + '.plans')
+plan_logger.propagate = False
+
+def get_plan_logger():
+    """Логгер планов (файл открывается при первом медленном запросе)"""
+    if not plan_logger.handlers:
+        handler = RotatingFileHandler(
+            SLOW_QUERY_PLAN_FILE, maxBytes=PLAN_FILE_MAX_BYTES,
+            backupCount=PLAN_FILE_BACKUPS, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        plan_logger.addHandler(handler)
+        plan_logger.setLevel(logging.INFO)
+    return plan_logger
+
+def normalize_sql(query):
+    """Текст запроса в одну строку"""
+    return re.sub(r'\s+', ' ', query).strip()
+
+# Пробелы и комментарии в начале запроса
+LEADING_NOISE = re.compile(r'\A(?:\s+|--[^\n]*(?:\n|\Z)|/\*.*?\*/)*', re.DOTALL)
+# Ключевые слова, с которыми запрос может изменить данные (в том числе в WITH)
+DATA_MODIFYING = re.compile(r'\b(?:insert|update|delete|merge|copy|truncate)\b', re.IGNORECASE)
+
+def is_explainable(query):
+    """Можно ли повторить запрос под EXPLAIN ANALYZE: только чтение (SELECT или WITH ... SELECT)"""
+    text = LEADING_NOISE.sub('', query)
+    first_word = text.split(None, 1)[0].lower() if text else ''
+    return first_word in ('select', 'with') and not DATA_MODIFYING.search(text)
+
+def params_shape(params):
+    """Типы параметров без значений (в параметрах бывают персональные данные)"""
+    if params is None:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f"{key}: {type(value).__name__}" for key, value in params.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in params) + ')'
+
+class SlowQueryCursor(AsyncCursor):
+    """Курсор, замеряющий время каждого запроса (включается через cursor_factory соединений пула)"""
+    
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        result = await super().execute(query, params, **kwargs)
+        duration = time.perf_counter() - started
+        if SLOW_QUERY_THRESHOLD_MS and duration * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+            await self.log_slow_query(query, params, params_shape(params), duration, explain=True)
+        return result
+    
+    async def executemany(self, query, params_seq, **kwargs):
+        params_seq = list(params_seq)
+        started = time.perf_counter()
+        await super().executemany(query, params_seq, **kwargs)
+        duration = time.perf_counter() - started
+        if SLOW_QUERY_THRESHOLD_MS and duration * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+            shape = f"{len(params_seq)} x " + (params_shape(params_seq[0]) if params_seq else '()')
+            await self.log_slow_query(query, None, shape, duration, explain=False)
+    
+    async def log_slow_query(self, query, params, shape, duration, explain):
+        """Запись медленного запроса в лог и (выборочно) его плана в файл"""
+        if not isinstance(query, str):
+            query = query.as_string(self.connection)
+        sql = normalize_sql(query)
+        method = current_method.get()
+        
+        logger.warning(
+            f"Медленный запрос в {method}: {duration * 1000:.0f} мс, строк {self.rowcount}, "
+            f"параметры {shape}: {sql}"
+        )
+        
+        # EXPLAIN ANALYZE выполняет запрос еще раз, поэтому только для чтения и только для выборки
+        if not explain or not is_explainable(query):
+            return
+        if random.random() >= SLOW_QUERY_EXPLAIN_RATE:
+            return
+        
+        try:
+            # Точка сохранения: ошибка EXPLAIN не должна прерывать транзакцию метода
+            async with self.connection.transaction():
+                # Обычный курсор, чтобы EXPLAIN не замерялся сам
+                async with AsyncCursor(self.connection) as cursor:
+                    await cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", params)
+                    plan = "\n".join(row[0] for row in await cursor.fetchall())
+        except Exception as e:
+            logger.warning(f"Не удалось получить план медленного запроса в {method}: {e}")
+            return
+        
+        get_plan_logger().info(
+            f"{method}: {duration * 1000:.0f} мс, строк {self.rowcount}, параметры {shape}\n"
+            f"{sql}\n{plan}\n"
+        )
@@ -0,0 +1,113 @@
+"""
+Справочники комплексов и ОИВ в памяти процесса.
+Загружаются при запуске и перечитываются по NOTIFY от триггеров на complexes/oivs.
+"""
+
+import asyncio
+import logging
+from database import db
+from oiv_search import normalize_name, oiv_index
+
+logger = logging.getLogger(__name__)
+
+# Канал уведомлений (см. миграцию 6)
+REFERENCE_CHANNEL = 'reference_changed'
+
+# Пауза перед переподключением слушателя после ошибки, секунд
+LISTEN_RETRY_DELAY = 5
+
+class ReferenceCache:
+    def __init__(self):
+        self.complexes = []
+        self.complexes_by_id = {}
+        self.oivs_by_id = {}
+        self.oivs_by_complex = {}
+        self.oivs_by_name = {}
+        # Увеличивается при каждой перезагрузке (для кэшей, зависящих от справочников)
+        self.version = 0
+        self._listener = None
+    
+    async def load(self):
+        """Загрузка справочников из БД"""
+        complexes = await db.get_complexes()
+        oivs = await db.get_all_oivs()
+        
+        complexes_by_id = {complex['id']: complex for complex in complexes}
+        oivs_by_id = {}
+        oivs_by_complex = {complex['id']: [] for complex in complexes}
+        oivs_by_name = {}
+        
+        # get_all_oivs уже отсортирован по комплексу и названию
+        for oiv in oivs:
+            oivs_by_id[oiv['id']] = oiv
+            oivs_by_complex.setdefault(oiv['complex_id'], []).append(oiv)
+            oivs_by_name[normalize_name(oiv['name'])] = oiv
+        
+        # Подменяем целиком, чтобы обработчики не видели полузагруженные справочники
+        self.complexes, self.complexes_by_id = complexes, complexes_by_id
+        self.oivs_by_id, self.oivs_by_complex, self.oivs_by_name = oivs_by_id, oivs_by_complex, oivs_by_name
+        oiv_index.build(oivs)
+        self.version += 1
+        
+        logger.info(f"Справочники загружены: комплексов {len(complexes)}, ОИВ {len(oivs)}")
+    
+    def get_complexes(self):
+        """Список комплексов (по ID)"""
+        return self.complexes
+    
+    def get_complex(self, complex_id):
+        """Комплекс по ID (или None)"""
+        return self.complexes_by_id.get(complex_id)
+    
+    def get_oivs_by_complex(self, complex_id):
+        """ОИВ комплекса (по названию)"""
+        return self.oivs_by_complex.get(complex_id, [])
+    
+    def get_oiv(self, oiv_id):
+        """ОИВ по ID с названием комплекса (или None)"""
+        return self.oivs_by_id.get(oiv_id)
+    
+    def get_oiv_by_name(self, name):
+        """ОИВ по точному названию без учета регистра (или None)"""
+        return self.oivs_by_name.get(normalize_name(name))
+    
+    def get_all_oivs(self):
+        """Все ОИВ (по комплексу и названию)"""
+        return list(self.oivs_by_id.values())
+    
+    async def listen(self):
+        """Ожидание уведомлений и перезагрузка справочников"""
+        while True:
+            try:
+                async for notify in db.listen(REFERENCE_CHANNEL):
+                    logger.info(f"Изменен справочник {notify.payload}, перезагрузка")
+                    await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка слушателя справочников: {e}")
+            
+            # Пока соединения не было, уведомления могли потеряться
+            await asyncio.sleep(LISTEN_RETRY_DELAY)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Ошибка загрузки справочников: {e}")
+    
+    def start(self):
+        """Запуск фонового слушателя уведомлений"""
+        if not self._listener:
+            self._listener = asyncio.create_task(self.listen())
+    
+    async def stop(self):
+        """Остановка слушателя уведомлений"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+# Глобальный кэш справочников
+reference = ReferenceCache()
@@ -0,0 +1,90 @@
+"""
+Ежедневные напоминания авторам о запланированных встречах:
+завтрашних, сегодняшних и просроченных (статус так и остался "Запланирована").
+Каждый автор получает одно сообщение со списком встреч и кнопками статуса.
+"""
+
+import asyncio
+import html
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from config import TIMEZONE
+from database import db, MEETING_STATUS_PLANNED
+from keyboards import MEETING_STATUSES, get_reminder_status_keyboard
+from notifications import notifier
+
+logger = logging.getLogger(__name__)
+
+# Сколько встреч читать из БД за раз
+REMINDER_BATCH_SIZE = 500
+
+# Сколько встреч показывать в одном напоминании: после массового импорта у автора
+# могут оказаться тысячи "запланированных" встреч, остальные указываются числом
+MAX_MEETINGS_PER_REMINDER = 10
+
+def format_reminder_line(number, meeting, today):
+    """Строка встречи в напоминании"""
+    if meeting['meeting_date'] > today:
+        when = "⏰ завтра"
+    elif meeting['meeting_date'] == today:
+        when = "⏰ сегодня"
+    else:
+        when = f"⚠️ {meeting['meeting_date'].strftime('%d.%m.%Y')}"
+    
+    summary = meeting['summary']
+    if len(summary) > 80:
+        summary = summary[:80] + "..."
+    
+    return f"{number}. {when}, {html.escape(meeting['oiv_name'])}: {html.escape(summary)}"
+
+def format_reminder(meetings, total, today):
+    """Текст напоминания автору: его встречи (не больше MAX_MEETINGS_PER_REMINDER) и сколько осталось"""
+    lines = ["📋 <b>Встречи в статусе «Запланирована»</b>", ""]
+    lines += [format_reminder_line(number, meeting, today) for number, meeting in enumerate(meetings, start=1)]
+    
+    if total > len(meetings):
+        lines += ["", f"…и еще {total - len(meetings)} (они придут в следующих напоминаниях)."]
+    
+    legend = ", ".join(
+        f"{icon} {status.lower()}" for status, icon in MEETING_STATUSES.items()
+        if status != MEETING_STATUS_PLANNED
+    )
+    lines += ["", f"Укажите итоговый статус кнопками с номером встречи ({legend}):"]
+    return "\n".join(lines)
+
+async def send_meeting_reminders(context):
+    """Задача JobQueue: одно напоминание каждому автору по его запланированным встречам до завтрашнего дня"""
+    today = datetime.now(TIMEZONE).date()
+    tomorrow = today + timedelta(days=1)
+    
+    # Автор -> [последние MAX_MEETINGS_PER_REMINDER встреч по дате, всего встреч]
+    authors = {}
+    after_key = None
+    while True:
+        # Читаем пачками, чтобы не держать в памяти тысячи встреч и не занимать соединение
+        meetings = await db.get_planned_meetings_due(tomorrow, after_key, REMINDER_BATCH_SIZE)
+        if not meetings:
+            break
+        
+        for meeting in meetings:
+            entry = authors.setdefault(meeting['user_id'], [deque(maxlen=MAX_MEETINGS_PER_REMINDER), 0])
+            entry[0].append(meeting)
+            entry[1] += 1
+        
+        after_key = (meetings[-1]['meeting_date'], meetings[-1]['id'])
+        # Даем обработчикам обновлений поработать между пачками
+        await asyncio.sleep(0)
+    
+    sent = 0
+    for user_id, (latest, total) in authors.items():
+        # Сначала ближайшие: завтрашние, сегодняшние, затем недавно просроченные
+        meetings = list(reversed(latest))
+        if await notifier.send(
+            user_id,
+            format_reminder(meetings, total, today),
+            reply_markup=get_reminder_status_keyboard(tuple(meeting['id'] for meeting in meetings))
+        ):
+            sent += 1
+    
+    logger.info(f"Отправлено напоминаний о запланированных встречах: {sent} (авторов {len(authors)})")
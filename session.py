@@ -0,0 +1,86 @@
+"""
+Ограничение памяти, занятой состоянием пользователей (context.user_data).
+Неактивные пользователи вытесняются периодической задачей, их данные удаляются.
+"""
+
+import logging
+import sys
+import time
+from telegram.ext import ConversationHandler
+from config import CONVERSATION_TIMEOUT, SESSION_IDLE_TIMEOUT, SESSION_MAX_USERS
+from access import user_cache
+
+logger = logging.getLogger(__name__)
+
+# Данные незавершенных диалогов (очищаются при отмене и по таймауту диалога)
+DIALOG_KEYS = [
+    'new_meeting', 'editing_meeting_id', 'editing_field', 'editing_complex_id',
+    'editing_oiv_id', 'new_user_id', 'stats_start'
+]
+
+# Время последнего обращения пользователя (time.monotonic)
+last_activity = {}
+started_at = time.monotonic()
+
+def clear_dialog_data(user_data):
+    """Удаление данных незавершенного диалога"""
+    for key in DIALOG_KEYS:
+        user_data.pop(key, None)
+
+def estimate_size(obj):
+    """Примерный размер объекта в памяти вместе с вложенными значениями, байт"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key) + estimate_size(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in obj)
+    return size
+
+async def track_activity(update, context):
+    """Отметка активности пользователя (обработчик в самой ранней группе)"""
+    if update.effective_user:
+        last_activity[update.effective_user.id] = time.monotonic()
+
+def end_conversations(application, user_id):
+    """Завершение диалогов пользователя во всех ConversationHandler (и в persistence).
+    
+    Без черновика в user_data состояние диалога бесполезно, а таймаут для диалогов,
+    восстановленных после перезапуска, PTB не взводит.
+    """
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                # Ключ диалога - (chat_id, user_id)
+                for key in [key for key in handler._conversations if key[-1] == user_id]:
+                    handler._update_state(ConversationHandler.END, key)
+
+async def evict_idle_sessions(context):
+    """Периодическая задача: вытеснение неактивных пользователей и отчет о памяти сессий"""
+    application = context.application
+    now = time.monotonic()
+    
+    # Сначала самые давно неактивные
+    users = sorted(application.user_data, key=lambda user_id: last_activity.get(user_id, started_at))
+    
+    evicted = 0
+    for index, user_id in enumerate(users):
+        idle = now - last_activity.get(user_id, started_at)
+        over_budget = len(users) - index > SESSION_MAX_USERS
+        # Сверх лимита вытесняем только тех, чей диалог уже точно истек по таймауту
+        if idle < SESSION_IDLE_TIMEOUT and (not over_budget or idle < CONVERSATION_TIMEOUT):
+            break
+        
+        # Удаляет данные и из памяти, и из persistence
+        application.drop_user_data(user_id)
+        end_conversations(application, user_id)
+        last_activity.pop(user_id, None)
+        evicted += 1
+    
+    # Записи о посторонних и давно неактивных тоже не должны копиться
+    user_cache.prune()
+    
+    total_size = sum(estimate_size(user_data) for user_data in application.user_data.values())
+    logger.info(
+        f"Сессии: пользователей {len(application.user_data)}, "
+        f"~{total_size / 1024:.1f} КБ, вытеснено {evicted}"
+    )
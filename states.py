@@ -20,3 +20,9 @@ EDIT_MEETING_FIELD = 10
     ADMIN_ADD_USER_NAME,
     ADMIN_DELETE_USER
 ) = range(20, 23)
+
+# Состояния для выбора произвольного периода статистики
+(
+    STATS_SELECT_START,
+    STATS_SELECT_END
+) = range(30, 32)
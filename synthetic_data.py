@@ -0,0 +1,129 @@
+"""
+Генератор синтетических встреч для бенчмарков и нагрузочных тестов.
+Встречи распределены по справочникам из init_db.py неравномерно, как в жизни:
+недавние даты, крупные ОИВ и активные сотрудники встречаются чаще.
+"""
+
+import random
+from datetime import date, timedelta
+from database import db, MEETING_STATUS_PLANNED
+from init_db import COMPLEXES_OIVS
+
+# Синтетические пользователи получают отрицательные Telegram ID начиная с этого:
+# Telegram выдает пользователям только положительные ID, поэтому синтетические
+# данные удаляются по диапазону [SYNTHETIC_USER_ID_START, 0) без риска задеть настоящие
+SYNTHETIC_USER_ID_START = -2_000_000_000
+SYNTHETIC_USER_NAME = "Тестовый сотрудник"
+
+# Доли итоговых статусов прошедших встреч (будущие всегда запланированы)
+PAST_STATUS_WEIGHTS = {
+    "Состоялась": 80,
+    "Отменена": 8,
+    "Перенесена": 7,
+    MEETING_STATUS_PLANNED: 5
+}
+
+SUMMARY_WORDS = [
+    "обсуждение", "проект", "бюджет", "сроки", "согласование", "документация",
+    "строительство", "закупка", "отчет", "контроль", "исполнение", "поручение",
+    "транспорт", "реконструкция", "график", "заявка", "регламент", "мониторинг",
+    "капремонт", "аудит", "соглашение", "презентация", "инвестиции", "план"
+]
+
+BATCH_SIZE = 10000
+
+def parse_count(text):
+    """Количество встреч из строки вида 10000, 100k, 1M"""
+    text = text.strip().lower()
+    multiplier = 1
+    if text.endswith('k'):
+        multiplier, text = 1000, text[:-1]
+    elif text.endswith('m'):
+        multiplier, text = 1_000_000, text[:-1]
+    return int(float(text) * multiplier)
+
+def zipf_weights(count, exponent=1.0):
+    """Веса убывающей популярности: первый элемент самый частый"""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def generate_meetings(count, oiv_ids, users=200, years=5, future_days=60, today=None, rng=None):
+    """Генератор кортежей встреч для Database.copy_meetings.
+    
+    Даты - за последние years лет с экспоненциальным сгущением к сегодняшнему дню
+    (и немного вперед), без выходных; популярность ОИВ и пользователей по закону Ципфа.
+    """
+    rng = rng or random.Random()
+    today = today or date.today()
+    
+    oiv_ids = list(oiv_ids)
+    rng.shuffle(oiv_ids)
+    oiv_weights = zipf_weights(len(oiv_ids), 0.8)
+    user_ids = [SYNTHETIC_USER_ID_START + index for index in range(users)]
+    user_weights = zipf_weights(users, 1.1)
+    
+    past_statuses = list(PAST_STATUS_WEIGHTS)
+    past_weights = list(PAST_STATUS_WEIGHTS.values())
+    max_age = years * 365
+    mean_age = max_age / 4
+    
+    for _ in range(count):
+        if rng.random() < future_days / (future_days + mean_age):
+            meeting_date = today + timedelta(days=rng.randint(1, future_days))
+            status = MEETING_STATUS_PLANNED
+        else:
+            age = min(int(rng.expovariate(1 / mean_age)), max_age)
+            meeting_date = today - timedelta(days=age)
+            status = rng.choices(past_statuses, past_weights)[0]
+        
+        # Выходные переносим на пятницу
+        if meeting_date.weekday() >= 5:
+            meeting_date -= timedelta(days=meeting_date.weekday() - 4)
+        
+        user_index = rng.choices(range(users), user_weights)[0]
+        duration = rng.choice([None, 15, 30, 30, 45, 60, 60, 90, 120])
+        summary = " ".join(rng.choices(SUMMARY_WORDS, k=rng.randint(5, 25))).capitalize()
+        
+        yield (
+            user_ids[user_index],
+            f"{SYNTHETIC_USER_NAME} {user_index + 1}",
+            rng.choices(oiv_ids, oiv_weights)[0],
+            meeting_date,
+            status,
+            duration,
+            summary
+        )
+
+async def get_reference_oiv_ids():
+    """ID ОИВ из справочника init_db.py (справочник должен быть заполнен)"""
+    names = {name for oiv_list in COMPLEXES_OIVS.values() for name in oiv_list}
+    oiv_ids = [oiv['id'] for oiv in await db.get_all_oivs() if oiv['name'] in names]
+    if not oiv_ids:
+        raise RuntimeError("Справочник ОИВ пуст. Запустите python init_db.py")
+    return oiv_ids
+
+async def delete_synthetic_meetings():
+    """Удаление синтетических встреч: количество удаленных"""
+    async with db.get_cursor() as cursor:
+        await cursor.execute(
+            "DELETE FROM meetings WHERE user_id >= %s AND user_id < 0", (SYNTHETIC_USER_ID_START,)
+        )
+        return cursor.rowcount
+
+async def seed_meetings(count, users=200, random_seed=None):
+    """Замена синтетических встреч новыми (COPY пачками) и обновление статистики планировщика"""
+    await delete_synthetic_meetings()
+    
+    oiv_ids = await get_reference_oiv_ids()
+    rows = generate_meetings(count, oiv_ids, users=users, rng=random.Random(random_seed))
+    
+    seeded = 0
+    while True:
+        batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+        if not batch:
+            break
+        seeded += await db.copy_meetings(batch)
+    
+    async with db.get_cursor() as cursor:
+        await cursor.execute("ANALYZE meetings")
+    
+    return seeded
@@ -0,0 +1,60 @@
+"""
+Журнал медленных запросов: какие запросы можно повторить под EXPLAIN ANALYZE
+и сохранение плана для медленного WITH ... SELECT (нужна БД из DATABASE_URL).
+"""
+
+import asyncio
+import os
+import pytest
+from psycopg import AsyncConnection
+import query_log
+from query_log import SlowQueryCursor, is_explainable
+
+def test_explainable_read_queries():
+    assert is_explainable("SELECT 1")
+    assert is_explainable("\n  WITH a AS (SELECT 1) SELECT * FROM a")
+    assert is_explainable("-- статистика\n/* сводка */ WITH a AS (SELECT 1) SELECT * FROM a")
+    assert is_explainable("SELECT updated_at, status_changed_at FROM meetings")
+
+def test_not_explainable_modifying_queries():
+    assert not is_explainable("UPDATE meetings SET status = 'x'")
+    assert not is_explainable("WITH d AS (DELETE FROM meetings RETURNING id) SELECT * FROM d")
+    assert not is_explainable("INSERT INTO meetings SELECT * FROM meetings")
+    assert not is_explainable("SELECT * FROM meetings FOR UPDATE")
+    assert not is_explainable("")
+
+@pytest.mark.skipif(not os.getenv('DATABASE_URL'), reason="нужна БД (DATABASE_URL)")
+def test_slow_with_select_is_explained(tmp_path, monkeypatch):
+    plan_file = tmp_path / 'plans.log'
+    monkeypatch.setattr(query_log, 'SLOW_QUERY_THRESHOLD_MS', 1)
+    monkeypatch.setattr(query_log, 'SLOW_QUERY_EXPLAIN_RATE', 1)
+    monkeypatch.setattr(query_log, 'SLOW_QUERY_PLAN_FILE', str(plan_file))
+    for handler in list(query_log.plan_logger.handlers):
+        query_log.plan_logger.removeHandler(handler)
+    
+    async def run():
+        async with await AsyncConnection.connect(
+            os.environ['DATABASE_URL'], cursor_factory=SlowQueryCursor
+        ) as conn:
+            token = query_log.current_method.set('test_method')
+            try:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        "WITH slow AS (SELECT pg_sleep(0.02), %s::int AS value) SELECT value FROM slow", (7,)
+                    )
+                    # Результат исходного запроса не затирается EXPLAIN
+                    return await cursor.fetchall()
+            finally:
+                query_log.current_method.reset(token)
+    
+    try:
+        assert asyncio.run(run()) == [(7,)]
+    finally:
+        for handler in list(query_log.plan_logger.handlers):
+            handler.close()
+            query_log.plan_logger.removeHandler(handler)
+    
+    plan = plan_file.read_text(encoding='utf-8')
+    assert 'test_method' in plan
+    assert 'WITH slow AS' in plan
+    assert 'Execution Time' in plan
@@ -0,0 +1,59 @@
+"""
+Параллельная обработка обновлений разных пользователей
+с сохранением порядка обновлений каждого пользователя.
+"""
+
+import asyncio
+from telegram.ext import BaseUpdateProcessor
+
+# Сколько обновлений может ждать своей очереди (сверх этого Application не берет новые)
+MAX_PENDING_UPDATES = 256
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Обновления разных пользователей обрабатываются параллельно (не больше max_concurrent),
+    обновления одного пользователя - строго по очереди, чтобы не ломались состояния диалогов.
+    """
+    
+    def __init__(self, max_concurrent):
+        # Семафор базового класса ограничивает только число ожидающих обновлений:
+        # если бы он ограничивал и параллельность, один пользователь, присылающий
+        # много обновлений подряд, мог бы занять все слоты ожиданием своей очереди
+        super().__init__(MAX_PENDING_UPDATES)
+        self.running = asyncio.Semaphore(max_concurrent)
+        # ID пользователя (или чата) -> [блокировка, число обновлений в очереди]
+        self.user_locks = {}
+    
+    @staticmethod
+    def update_key(update):
+        """Ключ очереди: пользователь, иначе чат, иначе None (без упорядочивания)"""
+        if getattr(update, 'effective_user', None):
+            return ('user', update.effective_user.id)
+        if getattr(update, 'effective_chat', None):
+            return ('chat', update.effective_chat.id)
+        return None
+    
+    async def do_process_update(self, update, coroutine):
+        key = self.update_key(update)
+        if key is None:
+            async with self.running:
+                await coroutine
+            return
+        
+        # Блокировки asyncio отдаются в порядке ожидания, а задачи обновлений
+        # доходят до этой точки в порядке получения - порядок сохраняется
+        entry = self.user_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self.running:
+                    await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.user_locks[key]
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
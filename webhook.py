@@ -0,0 +1,96 @@
+"""
+Режим webhook: HTTP-сервер принимает обновления от Telegram
+и отвечает на проверки здоровья (/healthz) на том же порту.
+"""
+
+import hashlib
+import logging
+import secrets
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from telegram import Update
+from config import WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, PORT
+from database import db
+
+logger = logging.getLogger(__name__)
+
+def webhook_secret_token():
+    """Секрет для Telegram: допустимы только [A-Za-z0-9_-], поэтому из WEBHOOK_SECRET
+    (на Render это base64 с +, / и =) берется его SHA-256 в hex"""
+    if WEBHOOK_SECRET:
+        return hashlib.sha256(WEBHOOK_SECRET.encode()).hexdigest()
+    # Если секрет не задан, он генерируется при каждом запуске (webhook тоже ставится при запуске)
+    return secrets.token_urlsafe(32)
+
+def create_web_app(application, secret_token):
+    """Starlette-приложение с маршрутами webhook и /healthz"""
+    
+    async def telegram_webhook(request: Request):
+        """Прием обновления от Telegram и передача в очередь бота"""
+        # Сравнение байтов за постоянное время (строки с не-ASCII символами compare_digest не принимает)
+        received = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '').encode()
+        if not secrets.compare_digest(received, secret_token.encode()):
+            return Response(status_code=403)
+        
+        try:
+            update = Update.de_json(await request.json(), application.bot)
+        except Exception as e:
+            logger.warning(f"Некорректное обновление в webhook: {e}")
+            return Response(status_code=400)
+        
+        await application.update_queue.put(update)
+        return Response()
+    
+    async def healthz(request: Request):
+        """Проверка здоровья: бот запущен и база данных отвечает"""
+        database_ok = await db.ping()
+        healthy = application.running and database_ok
+        return JSONResponse(
+            {'status': 'ok' if healthy else 'error', 'bot': application.running, 'database': database_ok},
+            status_code=200 if healthy else 503
+        )
+    
+    return Starlette(routes=[
+        Route(WEBHOOK_PATH, telegram_webhook, methods=['POST']),
+        Route('/healthz', healthz, methods=['GET']),
+    ])
+
+async def run_webhook(application, allowed_updates):
+    """Запуск бота в режиме webhook (вместо application.run_polling)"""
+    secret_token = webhook_secret_token()
+    server = uvicorn.Server(uvicorn.Config(
+        app=create_web_app(application, secret_token),
+        host='0.0.0.0',
+        port=PORT,
+        use_colors=False,
+        log_level='warning'
+    ))
+    
+    # Жизненный цикл повторяет run_polling: post_init, post_stop и post_shutdown вызываем сами
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        
+        await application.bot.set_webhook(
+            url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+            allowed_updates=allowed_updates,
+            secret_token=secret_token,
+            drop_pending_updates=True
+        )
+        await application.start()
+        logger.info(f"Webhook запущен на порту {PORT}")
+        
+        try:
+            await server.serve()
+        finally:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)